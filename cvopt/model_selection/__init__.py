@@ -1,4 +1,6 @@
 # coding: utf-8
-from ._search import SimpleoptCV, RandomoptCV, HyperoptCV, BayesoptCV, GAoptCV
+from ._search import SimpleoptCV, RandomoptCV, HyperoptCV, BayesoptCV, GAoptCV, HalvingoptCV
+from ._pruner import BasePruner, MedianPruner, ThresholdPruner
 
-__all__ = ("SimpleoptCV", "RandomoptCV", "HyperoptCV", "BayesoptCV", "GAoptCV")
\ No newline at end of file
+__all__ = ("SimpleoptCV", "RandomoptCV", "HyperoptCV", "BayesoptCV", "GAoptCV", "HalvingoptCV", 
+           "BasePruner", "MedianPruner", "ThresholdPruner")
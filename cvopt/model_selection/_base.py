@@ -1,20 +1,35 @@
-import os, sys, copy, time
+import os, sys, copy, time, numbers, shutil, warnings, tempfile, multiprocessing, concurrent.futures
 import pandas as pd, numpy as np
 from datetime import datetime
+from collections import OrderedDict
 from abc import ABCMeta, abstractmethod
 
 from sklearn.utils.metaestimators import if_delegate_has_method
 from sklearn.base import BaseEstimator, is_classifier
 from sklearn.metrics import SCORERS, make_scorer
-from sklearn.metrics.scorer import check_scoring
 from sklearn.model_selection import check_cv
-from sklearn.externals.joblib import dump, Parallel, delayed
+from sklearn.externals.joblib import Parallel, delayed, cpu_count
 from hyperopt import STATUS_OK, STATUS_FAIL
 
 from ..model_selection import _setting as st
-from ..search_setting._base import conv_param_distributions, search_category, decode_params
-from ..utils._base import chk_Xy, clone_estimator, compress
+from ._cache import EvalCache, mk_fingerprint, _canonicalize
+from ._pruner import get_pruner
+from ._scoring import CachedPredictor, MultiScorer, get_scorer, compute_scores
+from ..search_setting._base import conv_param_distributions, search_category, decode_params, chk_encodable
+from ..utils._base import chk_Xy, clone_estimator, compress, mk_dir
+from ..utils._data import DataPlane, to_memmap
 from ..utils._logger import CVSummarizer
+from ..utils._writer import AsyncWriter, dump_file
+
+# Errors raised by joblib when a task exceeds timeout(depends on joblib version and backend).
+TIMEOUT_ERRORS = (TimeoutError, multiprocessing.TimeoutError, concurrent.futures.TimeoutError)
+
+
+class TimeBudgetExceeded(Exception):
+    """
+    Raised by objective function when the next trials can not finish before the deadline.
+    """
+    pass
 
 class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
     """
@@ -28,18 +43,24 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
         This is used in logfile.
     feature_axis: int
         feature_select target axis. 
+    save_queue_size: int
+        Max number of estimators waiting to be saved in background(save_estimator > 0).
     """
     score_summarizer = np.mean
     score_summarizer_name = "mean"
     feature_axis = 1
+    save_queue_size = 8
 
     def __init__(self, estimator, param_distributions, 
                  scoring, cv, n_jobs, pre_dispatch, 
-                 verbose, logdir, save_estimator, model_id, refit, backend):
+                 verbose, logdir, save_estimator, model_id, refit, cache, eval_store, feature_cache_mb, memmap, pruner, 
+                 parallel_backend, trial_timeout, max_time, deadline, save_compress, save_oof, train_score, target_metric, log_format, backend, n_parallel_trials=1):
         # BACKLOG: Implement iid option(sklearn GridSearchCV have this option).
         
         self.estimator = estimator
-        self.scoring = check_scoring(estimator, scoring=scoring)
+        self.scoring = get_scorer(estimator, scoring=scoring, target_metric=target_metric)
+        self.target_metric = target_metric
+        self.log_format = log_format
         if hasattr(self.scoring, "_sign"):
             self.sign = self.scoring._sign
         else:
@@ -62,9 +83,27 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
         else:
             self.model_id = model_id
         self.refit = refit
+        self.cache = cache
+        self.eval_store = eval_store
+        self.feature_cache_mb = feature_cache_mb
+        self.memmap = memmap
+        self.pruner = pruner
+        self.parallel_backend = parallel_backend
+        self.trial_timeout = trial_timeout
+        self.max_time = max_time
+        self.deadline = deadline
+        self.save_compress = save_compress
+        self.save_oof = save_oof
+        self.train_score = train_score
 
+        if (not isinstance(n_parallel_trials, numbers.Integral)) or (n_parallel_trials < 1):
+            raise Exception("`n_parallel_trials`(batch_size in BayesoptCV) must be int >= 1.")
+        self.n_parallel_trials = n_parallel_trials
 
-    def _preproc_fit(self, X, y, validation_data, feature_groups):
+    def _preproc_fit(self, X, y, validation_data, feature_groups, resume=False):
+        if resume:
+            # Checked before workers and log files are started.
+            chk_encodable(self.param_distributions, backend=self.backend)
         X = chk_Xy(X, none_error=True, ravel_1d=False, msg_sjt="X")
         y = chk_Xy(y, none_error=False, ravel_1d=True, msg_sjt="y")
         if validation_data is None:
@@ -77,6 +116,19 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
         cv = check_cv(self.cv, y, classifier=is_classifier(self.estimator))
         self.n_splits_ = cv.get_n_splits()
 
+        if self.memmap:
+            # X, y and validation data are placed in the temporary folder once, 
+            # and workers receive references to them.
+            if isinstance(self.memmap, str):
+                mk_dir(self.memmap, error_level=0)
+                self._memmap_dir = tempfile.mkdtemp(prefix="cvopt_", dir=self.memmap)
+            else:
+                self._memmap_dir = tempfile.mkdtemp(prefix="cvopt_")
+            X, y = to_memmap(X, self._memmap_dir, "X"), to_memmap(y, self._memmap_dir, "y")
+            Xvalid, yvalid = to_memmap(Xvalid, self._memmap_dir, "Xvalid"), to_memmap(yvalid, self._memmap_dir, "yvalid")
+        else:
+            self._memmap_dir = None
+
         if feature_groups is None:
             self._feature_select = False
             param_distributions = {}
@@ -89,8 +141,58 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
         self._cvs = CVSummarizer(paraname_list=param_distributions.keys(), cvsize=self.n_splits_, 
                                  score_summarizer=BaseSearcher.score_summarizer, score_summarizer_name=BaseSearcher.score_summarizer_name, 
                                  valid=valid, sign=self.sign, model_id=self.model_id, verbose=self.verbose, 
-                                 save_estimator=self.save_estimator, logdir=self.logdir)
+                                 save_estimator=self.save_estimator, logdir=self.logdir, train=(self.train_score != "never"), 
+                                 metrics=self.scoring.signs if isinstance(self.scoring, MultiScorer) else None, log_format=self.log_format)
+        if resume:
+            self._cvs.load()
         self.cv_results_ = self._cvs()
+        self._raw_param_distributions = param_distributions
+
+        if self.eval_store and (self.logdir is None):
+            warnings.warn("eval_store is ignored because logdir is None.")
+        if self.eval_store and (self.logdir is not None):
+            store_dir = os.path.join(self.logdir, "eval_store")
+        else:
+            store_dir = None
+
+        if ((self.cache is None) or (self.cache is False)) and (store_dir is None):
+            self._evc = None
+        elif (self.cache is None) or isinstance(self.cache, bool):
+            self._evc = EvalCache(tol=None, store_dir=store_dir)
+        else:
+            self._evc = EvalCache(tol=float(self.cache), store_dir=store_dir)
+
+        self._pruner = get_pruner(self.pruner)
+
+        # Time(sec since epoch) by which search(including refit) must be finished.
+        self._deadline = np.inf if self.max_time is None else time.time() + self.max_time
+        if self.deadline is not None:
+            self._deadline = min(self._deadline, self.deadline.timestamp())
+        if np.isinf(self._deadline):
+            self._deadline = None
+
+        if (self.save_oof is None) or (self.save_oof is False):
+            self._oof_methods = None
+        elif self.save_oof is True:
+            self._oof_methods = ["predict"]
+        elif isinstance(self.save_oof, str):
+            self._oof_methods = [self.save_oof]
+        else:
+            self._oof_methods = list(self.save_oof)
+        if (self._oof_methods is not None) and (self.logdir is None):
+            warnings.warn("save_oof is ignored because logdir is None.")
+            self._oof_methods = None
+
+        if (self.logdir is not None) and ((self.save_estimator > 0) or (self._oof_methods is not None)):
+            # Estimators and predictions are saved in background so that search does not wait disk I/O.
+            self._writer = AsyncWriter(compress=self.save_compress, max_queue=BaseSearcher.save_queue_size)
+        else:
+            self._writer = None
+
+        # Workers are started once and reused by all trials in this fit.
+        self._parallel = Parallel(n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, backend=self.parallel_backend, 
+                                  timeout=self.trial_timeout)
+        self._parallel.__enter__()
 
         return X, y, Xvalid, yvalid, cv, conv_param_distributions(param_distributions, backend=self.backend)
 
@@ -98,8 +200,14 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
     def _postproc_fit(self, X, y, feature_groups, best_params, best_score):
         self.best_params_ = best_params
         self.best_score_ = best_score
+        self.top_k_params_ = self._cvs.top_k_params_
+        self.top_k_scores_ = self._cvs.top_k_scores_
+        # Memory-mapped X is used in refit, so it is removed in _close_fit.
+        self._close_fit(memmap=False)
         
-        if self.refit:
+        if self.refit and (self.best_params_ is None):
+            warnings.warn("refit is skipped because no candidate is evaluated successfully.")
+        elif self.refit:
             if self._feature_select:
                 self.feature_select_ind, _, estimator_params = mk_feature_select_index(self.best_params_, feature_groups, verbose=1)
                 self.best_estimator_ = clone_estimator(self.estimator, estimator_params)
@@ -113,6 +221,28 @@ class BaseSearcher(BaseEstimator, metaclass=ABCMeta):
         if self.verbose == 1:
             sys.stdout.write("\n\rBest_score(finished):%s" %np.round(self.best_score_, 2))
 
+    def _close_fit(self, memmap=True):
+        """
+        Release workers, background writer, log file and memory-mapped data(when memmap is True) of fit.
+
+        This is called in finally of fit, so it is run even if the search raises and it can be called more than once.
+        """
+        try:
+            if getattr(self, "_parallel", None) is not None:
+                parallel, self._parallel = self._parallel, None
+                parallel.__exit__(None, None, None)
+        finally:
+            try:
+                if getattr(self, "_writer", None) is not None:
+                    writer, self._writer = self._writer, None
+                    writer.close()
+            finally:
+                if getattr(self, "_cvs", None) is not None:
+                    self._cvs.close()
+                if memmap and (getattr(self, "_memmap_dir", None) is not None):
+                    shutil.rmtree(self._memmap_dir, ignore_errors=True)
+                    self._memmap_dir = None
+
     def _random_scoring(self, y):
         score = []
         for i in range(10):
@@ -262,7 +392,8 @@ def mk_feature_select_index(params, feature_groups, verbose):
 
 
 
-def fit_and_score(estimator, X, y, scoring, train_ind=None, test_ind=None, test_data=None):
+def fit_and_score(estimator, X, y, scoring, train_ind=None, test_ind=None, test_data=None, 
+                  feature_select_ind=None, feature_axis=1, predict_methods=None, train_score=True):
         """
         Run fit and compute evaluation index.
 
@@ -270,24 +401,112 @@ def fit_and_score(estimator, X, y, scoring, train_ind=None, test_ind=None, test_
         ---------- 
         test_data: tuple(X, y)
             When test_data is not None, ignore test_ind and use test_data in compute score_test.
+
+        feature_select_ind: numpy.array(bool) or None
+            When feature_select_ind is not None, feature select is run after X is split 
+            (used when X is memory-mapped and shared by workers).
+
+        predict_methods: list of str or None
+            When predict_methods is not None, predictions of test data by these estimator's methods are also returned.
+
+        train_score: bool
+            When False, score of train data is not computed(nan is returned).
+
+        Returns
+        -------
+        score_train, score_test, fittime, scoretime, estimator(, extra)
+            When predict_methods is not None or scoring is MultiScorer, extra(dict) is also returned.
+            extra["predictions"]: dict(key:method, value:prediction of test data)
+            extra["train_scores"], extra["test_scores"]: dict(key:metric name, value:score) of the other metrics.
         """
         if train_ind is None:
-            train_ind = np.arange(X.shape[0])
+            Xtrain, ytrain = X, y
+        else:
+            Xtrain, ytrain = X[train_ind], y[train_ind]
+        if feature_select_ind is not None:
+            Xtrain = compress(feature_select_ind, Xtrain, axis=feature_axis)
 
         start = time.time()
-        estimator.fit(X[train_ind], y[train_ind])
+        estimator.fit(Xtrain, ytrain)
         fittime = time.time() - start
 
-        start = time.time()
-        score_train = scoring(estimator, X[train_ind], y[train_ind])
-        scoretime = time.time() - start
+        multi_metric = isinstance(scoring, MultiScorer)
+        if train_score:
+            start = time.time()
+            score_train, scores_train = compute_scores(scoring, estimator, Xtrain, ytrain)
+            scoretime = time.time() - start
+        else:
+            score_train, scores_train = np.nan, ({key:np.nan for key in scoring.signs} if multi_metric else None)
         
         if test_data is None:
-            score_test = scoring(estimator, X[test_ind], y[test_ind])
+            Xtest, ytest = X[test_ind], y[test_ind]
         else:
-            score_test = scoring(estimator, *test_data)
+            Xtest, ytest = test_data
+        if feature_select_ind is not None:
+            Xtest = compress(feature_select_ind, Xtest, axis=feature_axis)
+        # Predictions of test data are shared by scorers and predict_methods.
+        predictor = CachedPredictor(estimator)
+        start = time.time()
+        score_test, scores_test = compute_scores(scoring, predictor, Xtest, ytest)
+        if not train_score:
+            # Score time is measured by test data instead.
+            scoretime = time.time() - start
+
+        if (predict_methods is None) and (not multi_metric):
+            return score_train, score_test, fittime, scoretime, estimator
+        extra = dict(train_scores=scores_train, test_scores=scores_test)
+        if predict_methods is not None:
+            extra["predictions"] = {method:getattr(predictor, method)(Xtest) for method in predict_methods}
+        return score_train, score_test, fittime, scoretime, estimator, extra
+
 
-        return score_train, score_test, fittime, scoretime, estimator
+
+def _copy_saved_files(cvs, src_model_id, src_index, n_splits, save_estimator):
+    """
+    Copy saved estimators and out-of-fold predictions of (src_model_id, src_index) to the next index
+    (used when result is reused).
+    """
+    if (src_model_id is None) or (src_index is None):
+        return
+    src_path = os.path.join(cvs.logdir, "estimators", str(src_model_id))
+    dst_path = os.path.join(cvs.logdir, "estimators", cvs.model_id)
+    src_prefix = str(src_model_id) + "_index" + "{0:05d}".format(src_index)
+    dst_prefix = cvs.model_id + "_index" + "{0:05d}".format(len(cvs.cv_results_["params"]))
+
+    suffixes = ["_split"+"{0:02d}".format(i)+".pkl" for i in range(n_splits)]
+    if save_estimator > 1:
+        suffixes.append("_test"+".pkl")
+    for suffix in suffixes:
+        if (save_estimator > 0) and os.path.isfile(os.path.join(src_path, src_prefix+suffix)):
+            shutil.copyfile(os.path.join(src_path, src_prefix+suffix), os.path.join(dst_path, dst_prefix+suffix))
+
+    src_path = os.path.join(cvs.logdir, "oof", str(src_model_id))
+    dst_path = os.path.join(cvs.logdir, "oof", cvs.model_id)
+    if os.path.isdir(src_path) and os.path.isdir(dst_path):
+        for name in os.listdir(src_path):
+            if name.startswith(src_prefix+"_"):
+                shutil.copyfile(os.path.join(src_path, name), os.path.join(dst_path, dst_prefix+name[len(src_prefix):]))
+
+
+
+def mk_resumed_obj_returns(cvs, failedscore, backend):
+    """
+    Make objective function's returns of loaded cv results(used to seed backend when search is resumed).
+    """
+    ret = []
+    scores = cvs.cv_results_.get(cvs.score_summarizer_name+"_test_score", [])
+    pruned = cvs.cv_results_.get("pruned", [False]*len(scores))
+    for cnt, score in enumerate(scores):
+        if pruned[cnt] == True:
+            # Pruned trial's score is summarized from the finished folds.
+            cv_test_scores = np.array([cvs.cv_results_[key][cnt] for key in cvs.test_score_keys], dtype=float)
+            score = cvs.score_summarizer(cv_test_scores[~np.isnan(cv_test_scores)])
+        if np.isnan(score):
+            ret.append(_obj_return(score=failedscore, succeed=False, backend=backend))
+        else:
+            # cvs stores the score whose sign is restored.
+            ret.append(_obj_return(score=cvs.sign*score, succeed=True, backend=backend))
+    return ret
 
 
 
@@ -307,19 +526,184 @@ def mk_objfunc(X, y, groups, feature_groups, feature_axis, estimator, scoring, c
                param_distributions, backend, failedscore, 
                score_summarizer=np.mean, 
                Xvalid=None, yvalid=None, n_jobs=1, pre_dispatch="2*n_jobs", 
-               cvsummarizer=None, save_estimator=0, min_n_features=2):
+               cvsummarizer=None, save_estimator=0, min_n_features=2, evalcache=None, feature_cache_nbytes=0, 
+               worker_feature_select=False, pruner=None, budget_param=None, max_budget=1, parallel=None, trial_timeout=None, 
+               deadline=None, refit=True, writer=None, oof_methods=None, train_score_mode="always"):
     """
     Function to make search objective function(input:params, output:evaluation index)
+
+    When input is list of params, candidates are evaluated concurrently and list of evaluation index is returned.
+    (In bayesopt, input matrix which has multiple rows is evaluated concurrently and returned as column vector.)
+
+    When evalcache(cvopt.model_selection._cache.EvalCache) is not None, 
+    the candidate which is already evaluated is not fitted again and stored result is returned.
+
+    cv splits are computed once in this function and shared by all candidates.
+    Feature selected X is made at most once per candidate(and cached within feature_cache_nbytes across candidates).
+    When worker_feature_select is True, X is passed to workers as it is and feature select is run in workers
+    (used when X is memory-mapped).
+
+    When pruner(cvopt.model_selection.BasePruner) is not None, a trial is stopped when pruner judges it hopeless.
+    The stopped trial is logged with pruned=True and scores of the finished folds, 
+    and the summarized score of the finished folds is returned to backend.
+
+    obj accepts budget and rung(int) for multi-fidelity search, and results are logged with them.
+    When return_stopped is True(list input only), list of bool which shows whether each candidate is pruned or timed out 
+    is also returned(used to exclude them from promotion).
+    When budget_param is None, budget is float in (0, 1] and each cv fold's train and test samples are subsampled to this fraction.
+    When budget_param(estimator's param name, e.g. n_estimators) is set, budget is the value of this param.
+    In this case, if estimator has warm_start, the candidate which was evaluated with a smaller budget 
+    is continued from the fitted estimators per cv fold(warm start) instead of fitting from scratch.
+    Validation data is evaluated only when budget is max_budget.
+
+    When parallel(joblib.Parallel which is already entered as context manager) is not None, 
+    fit_and_score tasks are run by it(workers are reused across trials), 
+    otherwise Parallel(n_jobs, pre_dispatch) is made per call.
+
+    When trial_timeout(sec) is not None, the trial which exceeds it is stored as failure with timed_out=True 
+    (scores of its finished folds are kept) and failedscore is returned. 
+    Running cv folds are stopped by joblib's timeout(see run, parallel's timeout is set per round).
+
+    When deadline(sec since epoch) is not None, the deadline is checked once per call(batch) before any candidate is started. 
+    Elapsed time of the batch is estimated from CVSummarizer's estimation per candidate and the number of fold-times 
+    the batch needs on n_jobs workers(refit time is added when refit is True). The batch is trimmed to the candidates 
+    which can finish, and TimeBudgetExceeded is raised after they are evaluated(or at once when no candidate can finish).
+
+    When writer(cvopt.utils._writer.AsyncWriter) is not None, estimators are saved by it in background.
+
+    When oof_methods(list of estimator's method name) is not None, out-of-fold predictions of each trial are saved 
+    in {logdir}/oof/{model_id} while fold estimators are fitted. 
+    Test indices of cv folds are saved in {model_id}_folds.npz(test_index: concatenated test indices, fold_sizes).
+
+    train_score_mode("always", "never" or "best_only") controls computing scores of train data.
+    When "best_only", train scores are computed(using fitted fold estimators) only for the trial which becomes the best.
+    Train scores which are not computed are stored as nan.
     """
+    if not train_score_mode in ["always", "never", "best_only"]:
+        raise Exception("`train_score` "+str(train_score_mode)+" is not supported.")
     n_splits_ = cv.get_n_splits()
+    n_workers = n_jobs if n_jobs > 0 else max(cpu_count()+1+n_jobs, 1)
     cvs = cvsummarizer
+    folds = list(cv.split(X, y, groups))
+    dp = DataPlane(X, feature_axis=feature_axis, max_nbytes=feature_cache_nbytes)
+    if Xvalid is None:
+        dp_valid = None
+    else:
+        dp_valid = DataPlane(Xvalid, feature_axis=feature_axis, max_nbytes=feature_cache_nbytes)
+
+    def mk_order(ind, rs):
+        """
+        Sample order for budget(subsample). Subsample of a larger budget includes the one of a smaller budget.
+        When estimator is classifier, each prefix of the order is stratified.
+        """
+        if (y is None) or (not is_classifier(estimator)) or (np.ndim(y) != 1):
+            return rs.permutation(len(ind))
+        y_ind = np.asarray(y)[ind]
+        key = np.empty(len(ind))
+        for label in np.unique(y_ind):
+            tgt = np.where(y_ind == label)[0]
+            key[tgt] = (rs.permutation(len(tgt)) + 0.5) / len(tgt)
+        return np.argsort(key, kind="mergesort")
+
+    rs = np.random.RandomState(0)
+    fold_orders = [(mk_order(train_ind, rs), mk_order(test_ind, rs)) for train_ind, test_ind in folds]
+
+    if (oof_methods is not None) and (cvs is not None) and (cvs.logdir is not None):
+        mk_dir(os.path.join(cvs.logdir, "oof", cvs.model_id), error_level=0)
+        np.savez(os.path.join(cvs.logdir, "oof", cvs.model_id, cvs.model_id+"_folds.npz"), 
+                 test_index=np.concatenate([test_ind for _, test_ind in folds]), 
+                 fold_sizes=np.array([len(test_ind) for _, test_ind in folds]))
+    else:
+        oof_methods = None
+
+    if (evalcache is not None) and (evalcache.store_dir is not None):
+        evalcache.open(mk_fingerprint(X=X, y=y, folds=folds, estimator=estimator, scoring=scoring, 
+                                      Xvalid=Xvalid, yvalid=yvalid, feature_groups=feature_groups))
+
+    warm_start = (budget_param is not None) and ("warm_start" in estimator.get_params())
+    # key: params except budget_param, value: (rung, budget, estimators per cv fold)
+    warm_estimators = {}
+
+    def subsample(ind, order, budget):
+        if (budget is None) or (budget_param is not None) or (budget >= 1):
+            return ind
+        return ind[np.sort(order[:max(int(np.ceil(budget*len(ind))), 1)])]
 
-    def obj(params):
+    def save(obj, path):
+        if writer is None:
+            dump_file(obj, path)
+        else:
+            writer.dump(obj, path)
+
+    def is_full(budget):
+        """
+        Whether test data is not subsampled by budget.
+        """
+        return (budget is None) or (budget_param is not None) or (budget >= 1)
+
+    def n_in_deadline(params_list):
+        """
+        Number of candidates(from the head of params_list) which can be evaluated concurrently 
+        and finish before the deadline(including refit).
+        Candidates of a batch share workers, so k candidates need about ceil(k*n_splits/n_workers) fold-times.
+        """
+        if (cvs is None) or (len(cvs.cv_results_["params"]) == 0):
+            return len(params_list) if time.time() < deadline else 0
+
+        elapsed_times = []
+        for params in params_list:
+            cvs._estimate_time_sec(decode_params(params=params, param_distributions=param_distributions, backend=backend))
+            elapsed_times.append(cvs.next_elapsed_time)
+        elapsed_times = np.array(elapsed_times, dtype=float)
+        elapsed_times[np.isnan(elapsed_times)] = np.nanmean(np.array(cvs.cv_results_["elapsed_time_sec"], dtype=float))
+        # A trial takes ceil(n_splits/n_workers) fold-times.
+        fold_times = np.nan_to_num(elapsed_times) / np.ceil(n_splits_ / n_workers)
+
+        refit_time = 0
+        if refit and (cvs.best_index_ is not None):
+            # Refit uses all samples.
+            refit_time = cvs.cv_results_["mean_fit_time"][cvs.best_index_] * n_splits_ / max(n_splits_-1, 1)
+
+        for n in range(len(params_list), 0, -1):
+            batch_time = np.ceil(n * n_splits_ / n_workers) * np.mean(fold_times[:n])
+            if time.time() + batch_time + np.nan_to_num(refit_time) <= deadline:
+                return n
+        return 0
+
+    def prepare(params, budget=None, rung=None):
+        """
+        Decode params and make trial setting.
+        Return (trial setting, None) or (None, objective function's return) when fitting is not needed.
+        """
         start_time = datetime.now()
         params = decode_params(params=params, param_distributions=param_distributions, backend=backend)
 
         cvs.display_status(params=params, start_time=start_time)
 
+        if budget is None:
+            cache_key = params
+        else:
+            # Result depends on budget.
+            cache_key = dict(params, **{"__budget__":budget})
+
+        if evalcache is not None:
+            cached = evalcache.get(cache_key)
+            if cached is not None:
+                if cvs is not None:
+                    if (cvs.logdir is not None) & ((save_estimator > 0) or (oof_methods is not None)):
+                        if writer is not None:
+                            # Source files may be waiting to be saved.
+                            writer.flush()
+                        _copy_saved_files(cvs, src_model_id=cached["model_id"], src_index=cached["index"], 
+                                         n_splits=n_splits_, save_estimator=save_estimator)
+                    end_time = datetime.now()
+                    cvs.store_cv_result(cv_train_scores=cached["cv_train_scores"], cv_test_scores=cached["cv_test_scores"], params=params, 
+                                        fit_times=cached["fit_times"], score_times=cached["score_times"], feature_select=feature_groups is not None,
+                                        X_shape=cached["X_shape"], start_time=start_time, end_time=end_time, 
+                                        train_score=cached["train_score"], validation_score=cached["validation_score"], 
+                                        cache_hit=True, budget=budget, rung=rung, metric_scores=cached.get("metric_scores"))
+                return None, _obj_return(score=score_summarizer(cached["cv_test_scores"]), succeed=True, backend=backend)
+
         if feature_groups is None:
             feature_select = False
             feature_select_ind = np.array([True]*X.shape[feature_axis])
@@ -328,74 +712,339 @@ def mk_objfunc(X, y, groups, feature_groups, feature_axis, estimator, scoring, c
             feature_select = True
             feature_select_ind, _, estimator_params = mk_feature_select_index(params, feature_groups, verbose=1)
             if feature_select_ind.sum() < min_n_features:
-                score = np.nan
                 if cvs is not None:
                     end_time = datetime.now()
                     cvs.store_cv_result(cv_train_scores=[np.nan]*n_splits_, cv_test_scores=[np.nan]*n_splits_, params=params, 
                                         fit_times=[np.nan]*n_splits_, score_times=[np.nan]*n_splits_, feature_select=feature_select,
-                                        X_shape=compress(feature_select_ind, X, axis=feature_axis).shape, 
+                                        X_shape=dp.shape(feature_select_ind), 
                                         start_time=start_time, end_time=end_time, 
-                                        train_score=np.nan, validation_score=np.nan)
-                return _obj_return(score=failedscore, succeed=False, backend=backend)
+                                        train_score=np.nan, validation_score=np.nan, budget=budget, rung=rung)
+                return None, _obj_return(score=failedscore, succeed=False, backend=backend)
+
+        warm_key, estimators_cv = None, None
+        if warm_start:
+            estimator_params["warm_start"] = True
+            warm_key = _canonicalize({key:params[key] for key in params if key != budget_param})
+            if warm_key in warm_estimators:
+                _, prev_budget, prev_estimators_cv = warm_estimators.pop(warm_key)
+                if prev_budget < budget:
+                    estimators_cv = prev_estimators_cv
+                    if writer is not None:
+                        # Estimators must not be modified until they are saved.
+                        writer.flush()
+
+        if worker_feature_select and (not feature_select_ind.all()):
+            # Workers run feature select. Feature selected X is made only when it is needed in this process.
+            X_fs = None
+        else:
+            X_fs = dp.get(feature_select_ind)
+
+        return dict(params=params, start_time=start_time, feature_select=feature_select, 
+                    feature_select_ind=feature_select_ind, estimator_params=estimator_params, X_fs=X_fs, 
+                    budget=budget, rung=rung, cache_key=cache_key, warm_key=warm_key, estimators_cv=estimators_cv, 
+                    elapsed=0.0), None
+
+    def get_X(trial):
+        """
+        Feature selected X of the trial(made at most once and kept while the trial is alive).
+        """
+        if trial["X_fs"] is None:
+            trial["X_fs"] = dp.get(trial["feature_select_ind"])
+        return trial["X_fs"]
+
+    def get_estimator(trial, fold):
+        if trial["estimators_cv"] is None:
+            return clone_estimator(estimator, trial["estimator_params"])
+        # Continue fitting from the estimator of the smaller budget.
+        return trial["estimators_cv"][fold].set_params(**{budget_param:trial["params"][budget_param]})
+
+    def mk_tasks(trial, start=0, stop=None):
+        """
+        Make fit_and_score tasks per cv fold(folds[start:stop]).
+        """
+        if worker_feature_select and (not trial["feature_select_ind"].all()):
+            X_cv, feature_select_ind_cv = X, trial["feature_select_ind"]
+        else:
+            X_cv, feature_select_ind_cv = get_X(trial), None
+
+        return [delayed(fit_and_score)(estimator=get_estimator(trial, fold), 
+                                       X=X_cv,  
+                                       y=y, 
+                                       train_ind=subsample(train_ind, train_order, trial["budget"]), 
+                                       test_ind=subsample(test_ind, test_order, trial["budget"]), 
+                                       scoring=scoring, 
+                                       feature_select_ind=feature_select_ind_cv, feature_axis=feature_axis, 
+                                       predict_methods=oof_methods if is_full(trial["budget"]) else None, 
+                                       train_score=(train_score_mode == "always"))
+                for fold, (train_ind, test_ind), (train_order, test_order) 
+                in zip(range(n_splits_)[start:stop], folds[start:stop], fold_orders[start:stop])]
+
+    def pruning_history(budget):
+        """
+        Test scores per fold of completed trials of the same budget(greater is better).
+        """
+        if (cvs is None) or (len(cvs.cv_results_["index"]) == 0):
+            return np.empty((0, n_splits_))
+        history = cvs.sign * np.array([cvs.cv_results_[key] for key in cvs.test_score_keys], dtype=float).T
+        # Pruned or failed trials have nan.
+        tgt = ~np.isnan(history).any(axis=1)
+        if "budget" in cvs.cv_results_:
+            budgets = np.array(cvs.cv_results_["budget"], dtype=float)
+            tgt &= np.isnan(budgets) if budget is None else (budgets == budget)
+        return history[tgt]
+
+    def finish(trial, ret_p, pruned=False, timed_out=False):
+        """
+        Evaluate validation data, save and store results, then return objective function's return.
 
-        # cross validation
+        When pruned or timed_out is True, ret_p is results of finished folds only. 
+        Scores of the other folds are stored as nan and validation data is not evaluated.
+        When timed_out is True, the trial is returned as failure.
+        Validation data is not evaluated either when budget is smaller than max_budget.
+        """
+        params, feature_select_ind, estimator_params = trial["params"], trial["feature_select_ind"], trial["estimator_params"]
+        budget, rung = trial["budget"], trial["rung"]
+        stopped = pruned or timed_out
         cv_train_scores = []
         cv_test_scores = []
         fit_times = []
         score_times = []
 
-        ret_p = Parallel(
-            n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
-        )(delayed(fit_and_score)(estimator=clone_estimator(estimator, estimator_params), 
-                                 X=compress(feature_select_ind, X, axis=feature_axis),  
-                                 y=y, 
-                                 train_ind=train_ind, test_ind=test_ind, 
-                                 scoring=scoring)
-        for train_ind, test_ind in cv.split(compress(feature_select_ind, X, axis=feature_axis), y, groups))
-
         # evaluate validation data
-        if Xvalid is None:
+        if (Xvalid is None) or stopped or ((budget is not None) and (budget < max_budget)):
             train_score, validation_score = np.nan, np.nan
+            ret_valid = None
         else:
-            train_score, validation_score, _, _, estimator_test = fit_and_score(
+            ret_valid = fit_and_score(
                 estimator=clone_estimator(estimator, estimator_params), 
-                X=compress(feature_select_ind, X, axis=feature_axis),  
+                X=get_X(trial),  
                 y=y, 
-                test_data=(compress(feature_select_ind, Xvalid, axis=feature_axis), yvalid), 
-                scoring=scoring)
+                test_data=(dp_valid.get(feature_select_ind), yvalid), 
+                scoring=scoring, predict_methods=oof_methods, train_score=(train_score_mode == "always"))
+            train_score, validation_score, _, _, estimator_test = ret_valid[:5]
 
         # summarize
+        if cvs is not None:
+            name_prefix = cvs.model_id + "_index" + "{0:05d}".format(len(cvs.cv_results_["params"]))
         if (cvs.logdir is not None) & (save_estimator > 0):
             estimators_cv = []
             path = os.path.join(cvs.logdir, "estimators", cvs.model_id)
-            name_prefix = cvs.model_id + "_index" + "{0:05d}".format(len(cvs.cv_results_["params"]))
-            for cnt, (i, j, k, l, m) in enumerate(ret_p):
+            for cnt, (i, j, k, l, m, *_) in enumerate(ret_p):
                 cv_train_scores.append(i)
                 cv_test_scores.append(j)
                 fit_times.append(k)
                 score_times.append(l)
 
-                dump(m, os.path.join(path, name_prefix+"_split"+"{0:02d}".format(cnt)+".pkl"))
+                save(m, os.path.join(path, name_prefix+"_split"+"{0:02d}".format(cnt)+".pkl"))
 
-            if (save_estimator > 1):
+            if (save_estimator > 1) and (not stopped) and ((budget is None) or (budget >= max_budget)):
                 if Xvalid is None:
                     estimator_test = clone_estimator(estimator, estimator_params)
-                    estimator_test.fit(compress(feature_select_ind, X, axis=feature_axis), y)
-                dump(estimator_test, os.path.join(path, name_prefix+"_test"+".pkl"))
+                    estimator_test.fit(get_X(trial), y)
+                save(estimator_test, os.path.join(path, name_prefix+"_test"+".pkl"))
         else:
-            for i, j, k, l, m in ret_p:
+            for i, j, k, l, m, *_ in ret_p:
                 cv_train_scores.append(i)
                 cv_test_scores.append(j)
                 fit_times.append(k)
                 score_times.append(l)
 
+        if (oof_methods is not None) and (not stopped) and is_full(budget):
+            path = os.path.join(cvs.logdir, "oof", cvs.model_id)
+            for method in oof_methods:
+                save(np.concatenate([i[5]["predictions"][method] for i in ret_p], axis=0), 
+                     os.path.join(path, name_prefix+"_oof_"+method+".npy"))
+                if ret_valid is not None:
+                    save(ret_valid[5]["predictions"][method], os.path.join(path, name_prefix+"_valid_"+method+".npy"))
+
+        if isinstance(scoring, MultiScorer):
+            # Scores of the metrics except target.
+            metric_scores = OrderedDict()
+            for key in scoring.signs:
+                metric_scores[key] = dict(cv_train_scores=[i[5]["train_scores"][key] for i in ret_p], 
+                                          cv_test_scores=[i[5]["test_scores"][key] for i in ret_p], 
+                                          train_score=np.nan if ret_valid is None else ret_valid[5]["train_scores"][key], 
+                                          validation_score=np.nan if ret_valid is None else ret_valid[5]["test_scores"][key])
+        else:
+            metric_scores = None
+
+        # Backend receives the score of finished folds(timed out trial is failure).
+        score = np.nan if timed_out else score_summarizer(cv_test_scores)
+        if (train_score_mode == "best_only") and (cvs is not None) and (not stopped) and ((budget is None) or (budget >= max_budget)) \
+            and (np.isnan(cvs.best_score_) or (score > cvs.sign*cvs.best_score_)):
+            # The trial becomes the best.
+            X_fs = get_X(trial)
+            ret_train = [compute_scores(scoring, i[4], X_fs[train_ind], y[train_ind]) for i, (train_ind, _) in zip(ret_p, folds)]
+            cv_train_scores = [i for i, _ in ret_train]
+            if ret_valid is not None:
+                train_score, scores_train = compute_scores(scoring, estimator_test, X_fs, y)
+            if metric_scores is not None:
+                for key in metric_scores:
+                    metric_scores[key]["cv_train_scores"] = [j[key] for _, j in ret_train]
+                    if ret_valid is not None:
+                        metric_scores[key]["train_score"] = scores_train[key]
+        if stopped:
+            if len(ret_p) == 0:
+                fit_times, score_times = [np.nan], [np.nan]
+            cv_train_scores += [np.nan]*(n_splits_-len(ret_p))
+            cv_test_scores += [np.nan]*(n_splits_-len(ret_p))
+            if metric_scores is not None:
+                for key in metric_scores:
+                    metric_scores[key]["cv_train_scores"] += [np.nan]*(n_splits_-len(ret_p))
+                    metric_scores[key]["cv_test_scores"] += [np.nan]*(n_splits_-len(ret_p))
+
+        if warm_start and (not stopped) and (budget < max_budget):
+            # Estimators of the rungs older than the previous one are not continued any more.
+            for key in [key for key in warm_estimators if not (rung-1 <= warm_estimators[key][0] <= rung)]:
+                del warm_estimators[key]
+            warm_estimators[trial["warm_key"]] = (rung, budget, [i[4] for i in ret_p])
+
+        if (evalcache is not None) and (not stopped):
+            evalcache.add(trial["cache_key"], dict(index=len(cvs.cv_results_["params"]) if cvs is not None else None, 
+                                       model_id=cvs.model_id if cvs is not None else None, 
+                                       cv_train_scores=cv_train_scores, cv_test_scores=cv_test_scores, 
+                                       fit_times=fit_times, score_times=score_times, 
+                                       X_shape=dp.shape(feature_select_ind), 
+                                       train_score=train_score, validation_score=validation_score, 
+                                       metric_scores=metric_scores))
+
         if cvs is not None:
             end_time = datetime.now()
             cvs.store_cv_result(cv_train_scores=cv_train_scores, cv_test_scores=cv_test_scores, params=params, 
-                                fit_times=fit_times, score_times=score_times, feature_select=feature_select,
-                                X_shape=compress(feature_select_ind, X, axis=feature_axis).shape,
-                                start_time=start_time, end_time=end_time, 
-                                train_score=train_score, validation_score=validation_score)
-        score = score_summarizer(cv_test_scores)
+                                fit_times=fit_times, score_times=score_times, feature_select=trial["feature_select"],
+                                X_shape=dp.shape(feature_select_ind),
+                                start_time=trial["start_time"], end_time=end_time, 
+                                train_score=train_score, validation_score=validation_score, pruned=pruned, timed_out=timed_out, 
+                                budget=budget, rung=rung, metric_scores=metric_scores)
+        if timed_out:
+            return _obj_return(score=failedscore, succeed=False, backend=backend)
         return _obj_return(score=score, succeed=True, backend=backend)
-    return obj
\ No newline at end of file
+
+    def dispatch(tasks, timeout=None):
+        if parallel is None:
+            return Parallel(n_jobs=n_jobs, pre_dispatch=pre_dispatch, timeout=timeout)(tasks)
+        else:
+            # joblib's timeout is applied to each task. It is set per round(see run).
+            parallel.timeout = timeout
+            return parallel(tasks)
+
+    def plan_round(active):
+        """
+        Number of cv folds per active trial which are dispatched in the next round.
+        """
+        if trial_timeout is not None:
+            # Folds are not more than workers, so that a fold does not wait for a free worker 
+            # and each trial's time is counted only while its folds are running.
+            # Trials which get no fold wait for the next round.
+            return [n_workers // len(active) + (1 if i < n_workers % len(active) else 0) for i in range(len(active))]
+        elif pruner is not None:
+            return [int(np.ceil(n_workers / len(active)))]*len(active)
+        else:
+            return [n_splits_]*len(active)
+
+    def run(prepared):
+        """
+        Run cv of prepared trials and return list of objective function's return.
+
+        When neither pruner nor trial_timeout is set, all (candidate, cv fold) pairs are dispatched to workers at once.
+        Otherwise folds are evaluated progressively in rounds(about n_jobs folds at a time).
+        When pruner is set, the trial which is judged hopeless by pruner is stopped.
+
+        When trial_timeout is set, folds of a round are not more than workers(a fold does not wait for a free worker), 
+        and time of a trial is the sum of the longest fit and score time of its folds per round
+        (time waiting for the other trials is not counted). joblib's timeout of a round is the smallest remaining time 
+        of the trials in the round. When the timeout stops the round, the trials of the round are run again one by one 
+        with their own remaining time, and only the trial whose folds are stopped again is stored as failure(timed_out=True) 
+        with the scores of its finished folds. When running folds can not be stopped(n_jobs=1 or threading backend), 
+        the trial is stopped after the round in which it exceeded trial_timeout. 
+        The trial whose all folds are finished is never stored as timed out.
+
+        Returns
+        -------
+        ret: list of objective function's return
+        stopped: list of bool
+            Whether the trial is pruned or timed out(its return is not the score of all cv folds).
+        """
+        ret = [obj_return for _, obj_return in prepared]
+        stopped = [False]*len(prepared)
+        active = [(cnt, trial, []) for cnt, (trial, _) in enumerate(prepared) if trial is not None]
+        while len(active) > 0:
+            n_folds = plan_round(active)
+            wave = [(cnt, trial, ret_p, n) for (cnt, trial, ret_p), n in zip(active, n_folds) if n > 0]
+            tasks = [mk_tasks(trial, start=len(ret_p), stop=len(ret_p)+n) for _, trial, ret_p, n in wave]
+            if trial_timeout is None:
+                timeout = None
+            else:
+                timeout = min([trial_timeout - trial["elapsed"] for _, trial, _, _ in wave])
+
+            try:
+                ret_tasks = dispatch(sum(tasks, []), timeout=timeout)
+                ret_trials = []
+                cnt_task = 0
+                for i in tasks:
+                    ret_trials.append(ret_tasks[cnt_task:cnt_task+len(i)])
+                    cnt_task += len(i)
+            except TIMEOUT_ERRORS:
+                # joblib stops all workers and results of the round are lost. 
+                if len(wave) == 1:
+                    ret_trials = [None]
+                else:
+                    # Run each trial separately to find the timed out one.
+                    ret_trials = []
+                    for _, trial, ret_p, n in wave:
+                        try:
+                            ret_trials.append(dispatch(mk_tasks(trial, start=len(ret_p), stop=len(ret_p)+n), 
+                                                       timeout=trial_timeout-trial["elapsed"]))
+                        except TIMEOUT_ERRORS:
+                            ret_trials.append(None)
+
+            histories = {}
+            # Trials which got no fold in this round run first in the next round.
+            next_active = [item for item, n in zip(active, n_folds) if n == 0]
+            for (cnt, trial, ret_p, _), ret_trial in zip(wave, ret_trials):
+                if ret_trial is None:
+                    # Running folds were stopped by trial_timeout.
+                    ret[cnt] = finish(trial, ret_p, timed_out=True)
+                    stopped[cnt] = True
+                    continue
+                # Folds of the round run concurrently.
+                trial["elapsed"] += max([i[2]+i[3] for i in ret_trial])
+                ret_p.extend(ret_trial)
+
+                if len(ret_p) == n_splits_:
+                    ret[cnt] = finish(trial, ret_p)
+                    continue
+                if (trial_timeout is not None) and (trial["elapsed"] >= trial_timeout):
+                    ret[cnt] = finish(trial, ret_p, timed_out=True)
+                    stopped[cnt] = True
+                    continue
+                if pruner is not None:
+                    if trial["budget"] not in histories:
+                        histories[trial["budget"]] = pruning_history(trial["budget"])
+                    if pruner.prune([i[1] for i in ret_p], histories[trial["budget"]]):
+                        ret[cnt] = finish(trial, ret_p, pruned=True)
+                        stopped[cnt] = True
+                        continue
+                next_active.append((cnt, trial, ret_p))
+            active = next_active
+        return ret, stopped
+
+    def obj(params, budget=None, rung=None, return_stopped=False):
+        if (backend == "bayesopt") and isinstance(params, np.ndarray) and (len(params) > 1):
+            # Batch proposed by GPyOpt(batch_size > 1). Each row is a candidate.
+            return np.array(obj([params[[i]] for i in range(len(params))])).reshape(-1, 1)
+
+        # Evaluate multiple candidates concurrently when params is list.
+        batch = params if isinstance(params, list) else [params]
+        n_batch = len(batch) if deadline is None else n_in_deadline(batch)
+        if n_batch == 0:
+            raise TimeBudgetExceeded()
+        ret, stopped = run([prepare(i, budget=budget, rung=rung) for i in batch[:n_batch]])
+        if n_batch < len(batch):
+            # The batch is trimmed to the candidates which can finish. Their results are already stored.
+            raise TimeBudgetExceeded()
+
+        if isinstance(params, list):
+            return (ret, stopped) if return_stopped else ret
+        return ret[0]
+    return obj
@@ -0,0 +1,163 @@
+import os, copy, pickle, warnings
+import numpy as np
+from sklearn.externals.joblib import hash as joblib_hash
+
+from ._scoring import MultiScorer
+from ..utils._base import mk_dir
+
+
+def _canonicalize(value):
+    """
+    Convert a parameter value to hashable and type-aware representation.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_canonicalize(i) for i in value))
+    elif isinstance(value, dict):
+        return ("dict", tuple((str(k), _canonicalize(value[k])) for k in sorted(value.keys(), key=str)))
+    elif isinstance(value, np.ndarray):
+        return ("ndarray", value.shape, tuple(_canonicalize(i) for i in value.ravel()))
+    elif isinstance(value, float) and np.isnan(value):
+        return ("float", "nan")
+
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value).__name__, repr(value))
+    return (type(value).__name__, value)
+
+
+def _is_float(value):
+    return isinstance(value, (float, np.floating)) and (not isinstance(value, bool)) and np.isfinite(value)
+
+
+def _callable_identity(func):
+    """
+    Identity of function which is same across processes(repr of function includes memory address).
+    """
+    if hasattr(func, "__qualname__"):
+        return (getattr(func, "__module__", None), func.__qualname__)
+    return (type(func).__module__, type(func).__qualname__)
+
+
+def scorer_identity(scoring):
+    """
+    Convert scoring to hashable identity which is same across processes.
+    """
+    if scoring is None:
+        return None
+    elif isinstance(scoring, MultiScorer):
+        return ("MultiScorer", tuple((key, scorer_identity(scoring.scorers[key])) for key in scoring.scorers), scoring.target)
+    elif hasattr(scoring, "_score_func"):
+        # scikit-learn's _BaseScorer
+        return (type(scoring).__name__, _callable_identity(scoring._score_func), 
+                getattr(scoring, "_sign", 1), _canonicalize(getattr(scoring, "_kwargs", {})))
+    else:
+        return _callable_identity(scoring)
+
+
+def mk_fingerprint(X, y, folds, estimator, scoring, Xvalid=None, yvalid=None, feature_groups=None):
+    """
+    Make fingerprint of search setting except candidate params.
+
+    If fingerprint is same, same candidate params give same result.
+    """
+    return joblib_hash([X, y, [(list(i), list(j)) for i, j in folds], 
+                        estimator.__class__.__module__+"."+estimator.__class__.__name__, estimator.get_params(deep=False), 
+                        scorer_identity(scoring), Xvalid, yvalid, feature_groups])
+
+
+class EvalCache:
+    """
+    Memoize cross validation results per candidate.
+
+    Key is canonicalized decoded params (feature_group params are included,
+    so feature selection is a part of key).
+
+    Parameters
+    ----------
+    tol: float or None, default=None.
+        When tol is None, a candidate is regarded as already evaluated only if all params are exactly same.
+        When tol is float, float params whose absolute difference is within tol are regarded as same.
+
+    store_dir: str or None, default=None.
+        Directory of persistent store. 
+        When store_dir is not None, after open is called, results are also appended to {store_dir}/{fingerprint}.pkl 
+        and results stored by other runs(same fingerprint) are reused.
+    """
+    def __init__(self, tol=None, store_dir=None):
+        self.tol = tol
+        self.store_dir = store_dir
+        self.store_path = None
+        self._entries = {}
+        self.n_hits = 0
+
+    def open(self, fingerprint):
+        """
+        Load persistent store correspond to fingerprint.
+        """
+        if self.store_dir is None:
+            return
+        mk_dir(self.store_dir, error_level=0)
+        self.store_path = os.path.join(self.store_dir, str(fingerprint)+".pkl")
+        if not os.path.isfile(self.store_path):
+            return
+
+        with open(self.store_path, "rb") as f:
+            while True:
+                try:
+                    params, result = pickle.load(f)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, TypeError):
+                    # The last record may be broken when the process was killed while writing.
+                    warnings.warn("%s has broken record. Records after it are ignored." %self.store_path)
+                    break
+                self._add(params, result)
+
+    def _mk_key(self, params):
+        exact_key = []
+        float_vals = []
+        for key in sorted(params.keys(), key=str):
+            if (self.tol is not None) and _is_float(params[key]):
+                exact_key.append((str(key), "float"))
+                float_vals.append(float(params[key]))
+            else:
+                exact_key.append((str(key), _canonicalize(params[key])))
+        return tuple(exact_key), np.array(float_vals)
+
+    def get(self, params):
+        """
+        Return stored result or None.
+        """
+        exact_key, float_vals = self._mk_key(params)
+        for stored_vals, result in self._entries.get(exact_key, []):
+            if (len(float_vals) == 0) or np.allclose(stored_vals, float_vals, rtol=0, atol=self.tol):
+                self.n_hits += 1
+                return copy.deepcopy(result)
+        return None
+
+    def _add(self, params, result):
+        exact_key, float_vals = self._mk_key(params)
+        self._entries.setdefault(exact_key, []).append((float_vals, copy.deepcopy(result)))
+
+    def add(self, params, result):
+        """
+        Store result.
+
+        Parameters
+        ----------
+        result: dict
+            Detail of the evaluation. This is returned by get as it is.
+        """
+        self._add(params, result)
+        if self.store_path is not None:
+            with open(self.store_path, "ab") as f:
+                pickle.dump((params, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def __len__(self):
+        return sum([len(i) for i in self._entries.values()])
@@ -37,8 +37,17 @@ def mutate(params, param_mutation_proba, param_distributions):
     return ret
 
 
-def gamin(obj, param_distributions, max_iter, iter_pergeneration, param_crossover_proba, param_mutation_proba, random_sampling_proba, cvsummarizer):
-    it = 0
+def gamin(obj, param_distributions, max_iter, iter_pergeneration, param_crossover_proba, param_mutation_proba, random_sampling_proba, cvsummarizer, 
+          start_iter=0, n_parallel_trials=1):
+    """
+    When start_iter > 0, cvsummarizer must have start_iter results(e.g. loaded from log file) 
+    and search is continued from the generation correspond to start_iter.
+
+    When n_parallel_trials > 1, population is evaluated per n_parallel_trials individuals concurrently
+    (obj must accept list of params).
+    """
+    it = start_iter
+    max_iter = start_iter + max_iter
     param_crossover_proba = to_func(param_crossover_proba)
     param_mutation_proba = to_func(param_mutation_proba)
     random_sampling_proba = to_func(random_sampling_proba)
@@ -55,14 +64,14 @@ def gamin(obj, param_distributions, max_iter, iter_pergeneration, param_crossove
         else:
             generaion = int((it+1) / iter_pergeneration)
             rsp = random_sampling_proba(generaion)
-            start_index = it - iter_pergeneration
-            fitness = eval_fitness(scores=np.array(cvsummarizer.cv_results_[cvsummarizer.score_summarizer_name+"_test_score"])[start_index:], 
+            start_index = max(it - iter_pergeneration, 0)
+            fitness = eval_fitness(scores=np.asarray(cvsummarizer.cv_results_[cvsummarizer.score_summarizer_name+"_test_score"])[start_index:], 
                                    sign=cvsummarizer.sign)
             
 
             if (fitness > 0).sum() < 2:
                 # If there are not enough parents in this generaion, use old generation scores.
-                fitness = eval_fitness(scores=np.array(cvsummarizer.cv_results_[cvsummarizer.score_summarizer_name+"_test_score"]), 
+                fitness = eval_fitness(scores=np.asarray(cvsummarizer.cv_results_[cvsummarizer.score_summarizer_name+"_test_score"]), 
                                        sign=cvsummarizer.sign)
                 start_index = 0
 
@@ -82,8 +91,12 @@ def gamin(obj, param_distributions, max_iter, iter_pergeneration, param_crossove
                 population.append(child)
     
         # Do search.
-        for params in population:
-            obj(params)
-            it += 1
+        for i in range(0, len(population), n_parallel_trials):
+            batch = population[i:i+n_parallel_trials][:max(max_iter-it, 1)]
+            if len(batch) == 1:
+                obj(batch[0])
+            else:
+                obj(batch)
+            it += len(batch)
             if it >= max_iter:
                 return
@@ -0,0 +1,110 @@
+import numpy as np
+
+
+class BasePruner:
+    """
+    Base class of pruner.
+
+    Pruner judges whether a trial should be stopped, using the test scores of finished cv folds.
+    Folds are evaluated in order, and pruner is called each time some folds are finished.
+
+    Scores which are given to pruner are greater is better(sign is multiplied).
+    """
+    def __init__(self, n_warmup_folds=1):
+        self.n_warmup_folds = n_warmup_folds
+
+    def prune(self, scores, history):
+        """
+        Judge whether a trial should be stopped.
+
+        Parameters
+        ----------
+        scores: numpy.array, shape = (n_finished_folds)
+            Test scores of finished folds of the trial.
+
+        history: numpy.array, shape = (n_trials, n_splits)
+            Test scores per fold of completed(not pruned, not failed) trials.
+
+        Returns
+        -------
+        prune: bool
+        """
+        if len(scores) < self.n_warmup_folds:
+            return False
+        return self._prune(np.asarray(scores, dtype=float), np.asarray(history, dtype=float))
+
+    def _prune(self, scores, history):
+        raise NotImplementedError
+
+
+
+class MedianPruner(BasePruner):
+    """
+    Stop a trial whose mean score of finished folds is worse than
+    the median of completed trials' mean scores at the same folds.
+
+    Parameters
+    ----------
+    n_startup_trials: int, default=5.
+        Pruning is not run until this number of trials are completed.
+
+    n_warmup_folds: int, default=1.
+        Pruning is not run until this number of folds are finished.
+    """
+    def __init__(self, n_startup_trials=5, n_warmup_folds=1):
+        super().__init__(n_warmup_folds=n_warmup_folds)
+        self.n_startup_trials = n_startup_trials
+
+    def _prune(self, scores, history):
+        if len(history) < max(self.n_startup_trials, 1):
+            return False
+        return np.mean(scores) < np.nanmedian(np.mean(history[:, :len(scores)], axis=1))
+
+
+
+class ThresholdPruner(BasePruner):
+    """
+    Stop a trial whose mean score of finished folds is worse than the best score by more than margin.
+
+    Parameters
+    ----------
+    margin: float, default=0.1.
+        Allowed difference from the best score.
+
+    relative: bool, default=True.
+        When True, margin is relative to the absolute value of the best score(margin*|best score|).
+
+    n_warmup_folds: int, default=1.
+        Pruning is not run until this number of folds are finished.
+    """
+    def __init__(self, margin=0.1, relative=True, n_warmup_folds=1):
+        super().__init__(n_warmup_folds=n_warmup_folds)
+        self.margin = margin
+        self.relative = relative
+
+    def _prune(self, scores, history):
+        if len(history) == 0:
+            return False
+        best = np.nanmax(np.mean(history, axis=1))
+        if self.relative:
+            threshold = best - self.margin*np.abs(best)
+        else:
+            threshold = best - self.margin
+        return np.mean(scores) < threshold
+
+
+
+def get_pruner(pruner):
+    """
+    Get pruner instance from str or pruner.
+    """
+    if pruner is None:
+        return None
+    elif pruner == "median":
+        return MedianPruner()
+    elif pruner == "threshold":
+        return ThresholdPruner()
+    elif hasattr(pruner, "prune"):
+        return pruner
+    else:
+        raise Exception("`pruner` "+str(pruner)+" is not supported.")
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from sklearn.metrics.scorer import check_scoring
+
+
+PREDICT_METHODS = ("predict", "predict_proba", "predict_log_proba", "decision_function")
+
+
+class CachedPredictor:
+    """
+    Wrap estimator and cache the outputs of predict methods.
+
+    Scorers call predict methods through this wrapper, so each method is run once per data.
+    Wrapper must be made per data(cache key is only method name).
+    """
+    def __init__(self, estimator):
+        self.estimator = estimator
+        self._cache = {}
+
+    def __getattr__(self, name):
+        if name in ("estimator", "_cache"):
+            raise AttributeError(name)
+        attr = getattr(self.estimator, name)
+        if not name in PREDICT_METHODS:
+            return attr
+
+        def cached(X):
+            if not name in self._cache:
+                self._cache[name] = attr(X)
+            return self._cache[name]
+        return cached
+
+
+
+class MultiScorer:
+    """
+    Compute multiple scores from a single prediction pass.
+
+    When called, returns the score of target metric(so this works like the scorer of target metric).
+    All scores are computed by score_all.
+
+    Parameters
+    ----------
+    scorers: OrderedDict
+        key: metric name, value: scorer.
+
+    target: str
+        Metric name of optimization target.
+    """
+    def __init__(self, scorers, target):
+        self.scorers = scorers
+        self.target = target
+        self._sign = getattr(scorers[target], "_sign", 1)
+        if hasattr(scorers[target], "_score_func"):
+            self._score_func = scorers[target]._score_func
+
+    def __call__(self, estimator, X, y):
+        return self.scorers[self.target](estimator, X, y)
+
+    def __repr__(self):
+        return "MultiScorer(scorers=%s, target=%s)" %(repr(list(self.scorers.keys())), repr(self.target))
+
+    @property
+    def signs(self):
+        """
+        Signs(greater is better: 1, else: -1) of the metrics except target.
+        """
+        return OrderedDict([(key, getattr(self.scorers[key], "_sign", 1)) for key in self.scorers if key != self.target])
+
+    def score_all(self, estimator, X, y):
+        """
+        Returns
+        -------
+        score: float
+            Score of target metric.
+
+        scores: dict
+            Scores of the metrics except target(key: metric name).
+        """
+        if not isinstance(estimator, CachedPredictor):
+            estimator = CachedPredictor(estimator)
+        scores = OrderedDict([(key, self.scorers[key](estimator, X, y)) for key in self.scorers])
+        score = scores.pop(self.target)
+        return score, scores
+
+
+
+def get_scorer(estimator, scoring, target_metric=None):
+    """
+    Get scorer from scoring.
+
+    When scoring is dict(key: metric name, value: str or scorer), MultiScorer is returned.
+    target_metric is the optimization target(when None, the first key of scoring).
+    """
+    if not isinstance(scoring, dict):
+        return check_scoring(estimator, scoring=scoring)
+
+    if len(scoring) == 0:
+        raise Exception("`scoring` must not be empty.")
+    if target_metric is None:
+        target_metric = list(scoring.keys())[0]
+    if not target_metric in scoring:
+        raise Exception("`target_metric` "+str(target_metric)+" is not in scoring.")
+    scorers = OrderedDict([(str(key), check_scoring(estimator, scoring=value)) for key, value in scoring.items()])
+    return MultiScorer(scorers, target=str(target_metric))
+
+
+def compute_scores(scoring, estimator, X, y):
+    """
+    Compute score(and scores of the other metrics when scoring is MultiScorer).
+
+    Returns
+    -------
+    score: float
+
+    scores: dict or None
+    """
+    if isinstance(scoring, MultiScorer):
+        return scoring.score_all(estimator, X, y)
+    return scoring(estimator, X, y), None
@@ -1,10 +1,13 @@
+import time, numbers
 import numpy as np
 
-from hyperopt import fmin, tpe, hp
+from hyperopt import fmin, tpe, hp, space_eval, Trials, STATUS_OK, JOB_STATE_DONE
+from hyperopt.base import Domain, spec_from_misc
 from GPyOpt.methods import BayesianOptimization
 
-from ._base import BaseSearcher, fit_and_score, mk_feature_select_index, mk_objfunc
+from ._base import BaseSearcher, TimeBudgetExceeded, fit_and_score, mk_feature_select_index, mk_objfunc, mk_resumed_obj_returns
 from ._ga import gamin
+from ..search_setting._base import ParamDist, encode_params, get_params
 from ..utils._base import clone_estimator, compress
 from ..utils._logger import CVSummarizer, NoteBookVisualizer
 
@@ -24,9 +27,12 @@ class SimpleoptCV():
     param_distributions: dict.
         Search space.
 
-    scoring: string or sklearn.metrics.make_scorer.
+    scoring: string, sklearn.metrics.make_scorer or dict.
         Evaluation index of search.
         When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
         
     cv: scikit-learn cross-validator or int(number of folds), default=5.
         Cross validation setting.
@@ -66,6 +72,12 @@ class SimpleoptCV():
         
         | ...
         
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
         |-estimators_{model_id}
         
             |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
@@ -83,6 +95,8 @@ class SimpleoptCV():
         
         2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
 
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
     model_id: str or None, default=None.
         This is used to log filename.
         When model_id is None, this is generated by date time.
@@ -90,6 +104,102 @@ class SimpleoptCV():
     refit: bool, default=True.
         Refit an estimator using the best found parameters on all train data(=X).
 
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    max_time: float, default=numpy.inf.
+        Time budget(sec) of fit. 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
     backend: str, default="hyperopt".
         backend optimeizer. Supports the following back ends.
 
@@ -101,6 +211,8 @@ class SimpleoptCV():
 
         * `randomopt`: Random Search
 
+        * `halvingopt`: Successive Halving(or Hyperband)
+
     Attributes
     ----------
     cv_results_ : dict of numpy (masked) ndarrays
@@ -115,36 +227,72 @@ class SimpleoptCV():
 
     best_params_ : dict
         Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
     """      
     def __init__(self, estimator, param_distributions, 
                  scoring=None, cv=5, max_iter=32, 
                  random_state=None, n_jobs=1, pre_dispatch="2*n_jobs", 
                  verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True, 
-                 backend="hyperopt", **kwargs): 
+                 backend="hyperopt", 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, max_time=np.inf, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv", 
+                 **kwargs): 
         if backend == "hyperopt":
             self.optcv = HyperoptCV(estimator, param_distributions, 
                                     scoring=scoring, cv=cv, max_iter=max_iter, random_state=random_state, 
                                     n_jobs=n_jobs, pre_dispatch=pre_dispatch, verbose=verbose, logdir=logdir, 
                                     save_estimator=save_estimator, model_id=model_id, refit=refit, 
+                                    cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                                    parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                                    save_compress=save_compress, save_oof=save_oof, 
+                                    train_score=train_score, target_metric=target_metric, log_format=log_format, 
                                     **kwargs)
         elif backend == "bayesopt":
             self.optcv = BayesoptCV(estimator, param_distributions, 
                                     scoring=scoring, cv=cv, max_iter=max_iter, random_state=random_state, 
                                     n_jobs=n_jobs, pre_dispatch=pre_dispatch, verbose=verbose, logdir=logdir, 
                                     save_estimator=save_estimator, model_id=model_id, refit=refit, 
+                                    cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                                    parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                                    save_compress=save_compress, save_oof=save_oof, 
+                                    train_score=train_score, target_metric=target_metric, log_format=log_format, 
                                     **kwargs)
         elif backend == "gaopt":
             self.optcv = GAoptCV(estimator, param_distributions, 
                                  scoring=scoring, cv=cv, max_iter=max_iter, random_state=random_state, 
                                  n_jobs=n_jobs, pre_dispatch=pre_dispatch, verbose=verbose, logdir=logdir, 
                                  save_estimator=save_estimator, model_id=model_id, refit=refit, 
+                                 cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                                 parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                                 save_compress=save_compress, save_oof=save_oof, 
+                                 train_score=train_score, target_metric=target_metric, log_format=log_format, 
                                  **kwargs)
         elif backend == "randomopt":
             self.optcv = RandomoptCV(estimator, param_distributions, 
                                      scoring=scoring, cv=cv, max_iter=max_iter, random_state=random_state, 
                                      n_jobs=n_jobs, pre_dispatch=pre_dispatch, verbose=verbose, logdir=logdir, 
                                      save_estimator=save_estimator, model_id=model_id, refit=refit, 
+                                     cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                                     parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                                     save_compress=save_compress, save_oof=save_oof, 
+                                     train_score=train_score, target_metric=target_metric, log_format=log_format, 
                                      **kwargs)
+        elif backend == "halvingopt":
+            self.optcv = HalvingoptCV(estimator, param_distributions, 
+                                      scoring=scoring, cv=cv, max_iter=max_iter, random_state=random_state, 
+                                      n_jobs=n_jobs, pre_dispatch=pre_dispatch, verbose=verbose, logdir=logdir, 
+                                      save_estimator=save_estimator, model_id=model_id, refit=refit, 
+                                      cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                                      parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                                      save_compress=save_compress, save_oof=save_oof, 
+                                      train_score=train_score, target_metric=target_metric, log_format=log_format, 
+                                      **kwargs)
         else:
             raise Exception("`backend` "+str(backend)+" is not supported.")
 
@@ -155,6 +303,76 @@ class SimpleoptCV():
 
         
 
+class _BatchObjective:
+    """
+    GPyOpt objective which passes whole batch to obj.
+    (GPyOpt's SingleObjective evaluates the batch row by row.)
+    """
+    def __init__(self, func):
+        self.func = func
+        self.objective_name = "cvopt_batch"
+
+    def evaluate(self, x):
+        start = time.time()
+        f_evals = np.array(self.func(x), dtype=float).reshape(-1, 1)
+        cost_evals = [(time.time()-start) / len(x)] * len(x)
+        return f_evals, cost_evals
+
+
+
+def _seed_hyperopt_trials(trials, cvs, param_distributions, failedscore):
+    """
+    Insert loaded cv results to hyperopt Trials.
+    """
+    results = mk_resumed_obj_returns(cvs, failedscore=failedscore, backend="hyperopt")
+    for tid, (params, result) in enumerate(zip(cvs.cv_results_["params"], results)):
+        vals = encode_params(params, param_distributions, backend="hyperopt")
+        misc = {"tid":tid, "cmd":("domain_attachment", "FMinIter_Domain"), "workdir":None, 
+                "idxs":dict([(key, [tid]) for key in vals.keys()]), 
+                "vals":dict([(key, [vals[key]]) for key in vals.keys()])}
+        doc = trials.new_trial_docs([tid], [None], [result], [misc])[0]
+        doc["state"] = JOB_STATE_DONE
+        trials.insert_trial_docs([doc])
+    trials.refresh()
+
+
+
+def _fmin_parallel(obj, space, algo, max_evals, trials, rstate, n_parallel_trials):
+    """
+    Run hyperopt search with evaluating n_parallel_trials candidates concurrently.
+
+    Candidates are suggested one by one. While a candidate is pending, it is regarded as finished with 
+    the mean loss of finished candidates(constant liar), so that next suggestion is not the same.
+    After all candidates are evaluated, the temporary results are replaced by the real results.
+    """
+    if rstate is None:
+        rstate = np.random.mtrand._rand
+    domain = Domain(obj, space)
+
+    while len(trials.trials) < max_evals:
+        tids = []
+        for _ in range(min(n_parallel_trials, max_evals - len(trials.trials))):
+            losses = [loss for loss in trials.losses() if (loss is not None) and np.isfinite(loss)]
+            liar = np.mean(losses) if len(losses) > 0 else 0.0
+
+            new_ids = trials.new_trial_ids(1)
+            trials.refresh()
+            docs = algo(new_ids, domain, trials, rstate.randint(2**31-1))
+            for doc in docs:
+                doc["state"] = JOB_STATE_DONE
+                doc["result"] = {"loss":liar, "status":STATUS_OK}
+            trials.insert_trial_docs(docs)
+            trials.refresh()
+            tids.extend(new_ids)
+
+        pendings = [trial for trial in trials.trials if trial["tid"] in tids]
+        results = obj([space_eval(space, spec_from_misc(trial["misc"])) for trial in pendings])
+        for trial, result in zip(pendings, results):
+            trial["result"] = result
+        trials.refresh()
+
+
+
 class HyperoptCV(BaseSearcher):
     """
     Cross validation optimize by Hyperopt(Sequential Model Based Global Optimization).
@@ -167,9 +385,12 @@ class HyperoptCV(BaseSearcher):
     param_distributions: dict.
         Search space.
 
-    scoring: string or sklearn.metrics.make_scorer.
+    scoring: string, sklearn.metrics.make_scorer or dict.
         Evaluation index of search.
         When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
         
     cv: scikit-learn cross-validator or int(number of folds), default=5.
         Cross validation setting.
@@ -209,6 +430,12 @@ class HyperoptCV(BaseSearcher):
         
         | ...
         
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
         |-estimators_{model_id}
         
             |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
@@ -226,6 +453,8 @@ class HyperoptCV(BaseSearcher):
         
         2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
 
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
     model_id: str or None, default=None.
         This is used to log filename.
         When model_id is None, this is generated by date time.
@@ -233,9 +462,113 @@ class HyperoptCV(BaseSearcher):
     refit: bool, default=True.
         Refit an estimator using the best found parameters on all train data(=X).
 
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    max_time: float, default=numpy.inf.
+        Time budget(sec) of fit. 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
     algo: hyperopt search algorithm class, default=tpe.suggest.
         Hyperopt's parameter. Search algorithm.
 
+    n_parallel_trials: int, default=1.
+        Number of candidates which are evaluated concurrently.
+        All (candidate, cv fold) pairs are dispatched to n_jobs workers at once, 
+        so throughput scales with n_jobs rather than number of folds.
+
+        In HyperoptCV, candidates are suggested one by one 
+        and pending candidates are regarded as finished with the mean loss of finished candidates(constant liar).
+
     Attributes
     ----------
     cv_results_ : dict of numpy (masked) ndarrays
@@ -250,16 +583,31 @@ class HyperoptCV(BaseSearcher):
 
     best_params_ : dict
         Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
     """
     def __init__(self, estimator, param_distributions, 
                  scoring=None, cv=5, max_iter=32, 
                  random_state=None, n_jobs=1, pre_dispatch="2*n_jobs", 
                  verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True, 
-                 algo=tpe.suggest):
+                 algo=tpe.suggest, 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, max_time=np.inf, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv", 
+                 n_parallel_trials=1):
         super().__init__(estimator=estimator, param_distributions=param_distributions, 
                          scoring=scoring, cv=cv,  n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
                          verbose=verbose, logdir=logdir, save_estimator=save_estimator, 
-                         model_id=model_id, refit=refit, backend="hyperopt")
+                         model_id=model_id, refit=refit, 
+                         cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                         parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                         save_compress=save_compress, save_oof=save_oof, 
+                         train_score=train_score, target_metric=target_metric, log_format=log_format, backend="hyperopt", 
+                         n_parallel_trials=n_parallel_trials)
 
         self.max_iter = max_iter
         self.algo = algo
@@ -269,7 +617,7 @@ class HyperoptCV(BaseSearcher):
             self.random_state = np.random.RandomState(int(random_state))
 
     def fit(self, X, y=None, validation_data=None, groups=None, 
-            feature_groups=None, min_n_features=2):
+            feature_groups=None, min_n_features=2, resume=False):
         """
         Run fit.
 
@@ -297,23 +645,48 @@ class HyperoptCV(BaseSearcher):
             When number of X's feature cols is less than min_n_features, return search failure.
             
             e.g. If estimator has columns sampling function, use this option to avoid X become too small and error.
+
+        resume: bool, default=False.
+            When True, search is resumed from the log file({logdir}/cv_results/{model_id}.csv) of the same model_id.
+            Logged results are loaded and the backend optimizer's state is seeded from them, 
+            then max_iter new candidates are searched.
+            param_distributions must be cvopt style(search_numeric, search_category) to resume
+            (hyperopt's native space can not be encoded to seed Trials).
         """
-        X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups)
-
-        obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
-                         estimator=self.estimator, scoring=self.scoring, cv=cv, 
-                         param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
-                         score_summarizer=BaseSearcher.score_summarizer, 
-                         Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
-                         cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features)
-
-        try :
-            fmin(obj, param_distributions, algo=self.algo, max_evals=self.max_iter, rstate=self.random_state)
-        except KeyboardInterrupt:
-            pass
-
-        self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
-                           best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        try:
+            X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups, 
+                                                                            resume=resume)
+
+            obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
+                             estimator=self.estimator, scoring=self.scoring, cv=cv, 
+                             param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
+                             score_summarizer=BaseSearcher.score_summarizer, 
+                             Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
+                             cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features, 
+                             evalcache=self._evc, feature_cache_nbytes=int(self.feature_cache_mb*1024**2), 
+                             worker_feature_select=bool(self.memmap), pruner=self._pruner, parallel=self._parallel, 
+                             trial_timeout=self.trial_timeout, deadline=self._deadline, refit=self.refit, writer=self._writer, 
+                             oof_methods=self._oof_methods, train_score_mode=self.train_score)
+
+            trials = Trials()
+            if resume:
+                _seed_hyperopt_trials(trials, cvs=self._cvs, param_distributions=self._raw_param_distributions, failedscore=np.nan)
+
+            try :
+                if self.n_parallel_trials > 1:
+                    _fmin_parallel(obj, param_distributions, algo=self.algo, max_evals=len(trials.trials)+self.max_iter, 
+                                   trials=trials, rstate=self.random_state, n_parallel_trials=self.n_parallel_trials)
+                else:
+                    fmin(obj, param_distributions, algo=self.algo, max_evals=len(trials.trials)+self.max_iter, 
+                         rstate=self.random_state, trials=trials)
+            except (KeyboardInterrupt, TimeBudgetExceeded):
+                pass
+
+            self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
+                               best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        finally:
+            # Workers, writers and log files are released even if the search raises.
+            self._close_fit()
         return self
 
 
@@ -330,9 +703,12 @@ class BayesoptCV(BaseSearcher):
     param_distributions: dict.
         Search space.
 
-    scoring: string or sklearn.metrics.make_scorer.
+    scoring: string, sklearn.metrics.make_scorer or dict.
         Evaluation index of search.
         When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
         
     cv: scikit-learn cross-validator or int(number of folds), default=5.
         Cross validation setting.
@@ -372,6 +748,12 @@ class BayesoptCV(BaseSearcher):
         
         | ...
         
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
         |-estimators_{model_id}
         
             |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
@@ -389,6 +771,8 @@ class BayesoptCV(BaseSearcher):
         
         2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
 
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
     model_id: str or None, default=None.
         This is used to log filename.
         When model_id is None, this is generated by date time.
@@ -396,8 +780,101 @@ class BayesoptCV(BaseSearcher):
     refit: bool, default=True.
         Refit an estimator using the best found parameters on all train data(=X).
 
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
     max_time: float, default=numpy.inf.
-        GpyOpt`s parameter. Maximum exploration horizon in seconds.
+        Time budget(sec) of fit(also passed to GpyOpt). 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
 
     model_type: str, default="GP".
         GpyOpt`s parameter. Type of model to use as surrogate.
@@ -477,6 +954,9 @@ class BayesoptCV(BaseSearcher):
     batch_size: int, default=1. 
         GpyOpt`s parameter. Size of the batch in which the objective is evaluated.
 
+        When batch_size > 1, candidates in a batch are evaluated concurrently
+        (all (candidate, cv fold) pairs are dispatched to n_jobs workers at once).
+
     Attributes
     ----------
     cv_results_ : dict of numpy (masked) ndarrays
@@ -491,6 +971,12 @@ class BayesoptCV(BaseSearcher):
 
     best_params_ : dict
         Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
     """
 
     def __init__(self, estimator, param_distributions, 
@@ -501,16 +987,23 @@ class BayesoptCV(BaseSearcher):
                  initial_design_numdata=5, initial_design_type="random", 
                  acquisition_type="EI", normalize_Y=True, exact_feval=False, 
                  acquisition_optimizer_type="lbfgs", model_update_interval=1, 
-                 evaluator_type="sequential", batch_size=1):
+                 evaluator_type="sequential", batch_size=1, 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv"):
 
         super().__init__(estimator=estimator, param_distributions=param_distributions, 
                          scoring=scoring, cv=cv, n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
                          verbose=verbose, logdir=logdir, save_estimator=save_estimator, 
-                         model_id=model_id, refit=refit, backend="bayesopt")
+                         model_id=model_id, refit=refit, 
+                         cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                         parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                         save_compress=save_compress, save_oof=save_oof, 
+                         train_score=train_score, target_metric=target_metric, log_format=log_format, backend="bayesopt", 
+                         n_parallel_trials=batch_size)
         
         self.random_state = random_state
         self.max_iter = max_iter
-        self.max_time = max_time
         self.model_type = model_type
         self.initial_params = initial_params
         self.initial_score = initial_score
@@ -527,7 +1020,7 @@ class BayesoptCV(BaseSearcher):
         self.failedscore = None
 
     def fit(self, X, y=None, validation_data=None, groups=None, 
-            feature_groups=None, min_n_features=2):
+            feature_groups=None, min_n_features=2, resume=False):
         """
         Run fit.
 
@@ -555,39 +1048,66 @@ class BayesoptCV(BaseSearcher):
             When number of X's feature cols is less than min_n_features, return search failure.
             
             e.g. If estimator has columns sampling function, use this option to avoid X become too small and error.
+
+        resume: bool, default=False.
+            When True, search is resumed from the log file({logdir}/cv_results/{model_id}.csv) of the same model_id.
+            Logged results are loaded and the backend optimizer's state is seeded from them, 
+            then max_iter new candidates are searched.
         """
-        X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups)
-        np.random.seed(self.random_state)
-
-        if self.failedscore is None:
-            # If search is failed, Return random score.
-            # random score is fixed at first fit.
-            self.failedscore = self._random_scoring(y)
-
-        obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
-                         estimator=self.estimator, scoring=self.scoring, cv=cv, 
-                         param_distributions=param_distributions, backend=self.backend, failedscore=self.failedscore, 
-                         score_summarizer=BaseSearcher.score_summarizer, 
-                         Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
-                         cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features)
-
-        self.opt = BayesianOptimization(obj, domain=param_distributions, constraints=None, cost_withGradients=None, 
-                                        model_type=self.model_type, X=self.initial_params, Y=self.initial_score,
-                                        initial_design_numdata=self.initial_design_numdata, 
-                                        initial_design_type=self.initial_design_type, 
-                                        acquisition_type=self.acquisition_type, normalize_Y=self.normalize_Y,
-                                        exact_feval=self.exact_feval, acquisition_optimizer_type=self.acquisition_optimizer_type, 
-                                        model_update_interval=self.model_update_interval, evaluator_type=self.evaluator_type, 
-                                        batch_size=self.batch_size, num_cores=1, verbosity=False, verbosity_model=False, 
-                                        maximize=False, de_duplication=False)   
-
-        try :
-            self.opt.run_optimization(max_iter=self.max_iter, max_time=self.max_time)
-        except KeyboardInterrupt:
-            pass
-        
-        self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
-                           best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        try:
+            X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups, 
+                                                                            resume=resume)
+            np.random.seed(self.random_state)
+
+            if self.failedscore is None:
+                # If search is failed, Return random score.
+                # random score is fixed at first fit.
+                self.failedscore = self._random_scoring(y)
+
+            obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
+                             estimator=self.estimator, scoring=self.scoring, cv=cv, 
+                             param_distributions=param_distributions, backend=self.backend, failedscore=self.failedscore, 
+                             score_summarizer=BaseSearcher.score_summarizer, 
+                             Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
+                             cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features, 
+                             evalcache=self._evc, feature_cache_nbytes=int(self.feature_cache_mb*1024**2), 
+                             worker_feature_select=bool(self.memmap), pruner=self._pruner, parallel=self._parallel, 
+                             trial_timeout=self.trial_timeout, deadline=self._deadline, refit=self.refit, writer=self._writer, 
+                             oof_methods=self._oof_methods, train_score_mode=self.train_score)
+
+            initial_params, initial_score = self.initial_params, self.initial_score
+            if resume and (len(self._cvs.cv_results_["params"]) > 0):
+                resumed_params = np.vstack([encode_params(params, self._raw_param_distributions, backend=self.backend) 
+                                            for params in self._cvs.cv_results_["params"]])
+                resumed_score = np.array(mk_resumed_obj_returns(self._cvs, failedscore=self.failedscore, backend=self.backend)).reshape(-1, 1)
+                if (initial_params is None) or (initial_score is None):
+                    initial_params, initial_score = resumed_params, resumed_score
+                else:
+                    initial_params = np.vstack([initial_params, resumed_params])
+                    initial_score = np.vstack([initial_score, resumed_score])
+
+            try :
+                self.opt = BayesianOptimization(obj, domain=param_distributions, constraints=None, cost_withGradients=None, 
+                                                model_type=self.model_type, X=initial_params, Y=initial_score,
+                                                initial_design_numdata=self.initial_design_numdata, 
+                                                initial_design_type=self.initial_design_type, 
+                                                acquisition_type=self.acquisition_type, normalize_Y=self.normalize_Y,
+                                                exact_feval=self.exact_feval, acquisition_optimizer_type=self.acquisition_optimizer_type, 
+                                                model_update_interval=self.model_update_interval, evaluator_type=self.evaluator_type, 
+                                                batch_size=self.batch_size, num_cores=1, verbosity=False, verbosity_model=False, 
+                                                maximize=False, de_duplication=False)   
+                if self.batch_size > 1:
+                    # Candidates in a batch are evaluated concurrently.
+                    self.opt.objective = _BatchObjective(obj)
+                self.opt.run_optimization(max_iter=self.max_iter, max_time=self.max_time)
+            except (KeyboardInterrupt, TimeBudgetExceeded):
+                pass
+        
+            self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
+                               best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        finally:
+            # Workers, writers and log files are released even if the search raises.
+            self._close_fit()
         return self
 
 
@@ -603,9 +1123,12 @@ class GAoptCV(BaseSearcher):
     param_distributions: dict.
         Search space.
 
-    scoring: string or sklearn.metrics.make_scorer.
+    scoring: string, sklearn.metrics.make_scorer or dict.
         Evaluation index of search.
         When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
         
     cv: scikit-learn cross-validator or int(number of folds), default=5.
         Cross validation setting.
@@ -645,6 +1168,12 @@ class GAoptCV(BaseSearcher):
         
         | ...
         
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
         |-estimators_{model_id}
         
             |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
@@ -662,6 +1191,8 @@ class GAoptCV(BaseSearcher):
         
         2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
 
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
     model_id: str or None, default=None.
         This is used to log filename.
         When model_id is None, this is generated by date time.
@@ -669,6 +1200,102 @@ class GAoptCV(BaseSearcher):
     refit: bool, default=True.
         Refit an estimator using the best found parameters on all train data(=X).
 
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    max_time: float, default=numpy.inf.
+        Time budget(sec) of fit. 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
     iter_pergeneration: int, default=8.
         Genetic algorithm's parameter. Number of iteration per generation (it corresponds to number of population.).
 
@@ -695,6 +1322,12 @@ class GAoptCV(BaseSearcher):
 
         Function whose variable is number of generation Could be passed to this variable.
 
+    n_parallel_trials: int, default=1.
+        Number of candidates which are evaluated concurrently.
+        All (candidate, cv fold) pairs are dispatched to n_jobs workers at once, 
+        so throughput scales with n_jobs rather than number of folds.
+        In GAoptCV, candidates in the same generation are evaluated concurrently(at most iter_pergeneration).
+
     Attributes
     ----------
     cv_results_ : dict of numpy (masked) ndarrays
@@ -709,17 +1342,32 @@ class GAoptCV(BaseSearcher):
 
     best_params_ : dict
         Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
     """
     def __init__(self, estimator, param_distributions, 
                  scoring=None, cv=5, max_iter=32, 
                  random_state=None, n_jobs=1, pre_dispatch="2*n_jobs", 
                  verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True, 
                  iter_pergeneration=8, param_crossover_proba=0.5, param_mutation_proba=0.01, 
-                 random_sampling_proba=0.01):
+                 random_sampling_proba=0.01, 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, max_time=np.inf, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv", 
+                 n_parallel_trials=1):
         super().__init__(estimator=estimator, param_distributions=param_distributions, 
                          scoring=scoring, cv=cv,  n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
                          verbose=verbose, logdir=logdir, save_estimator=save_estimator, 
-                         model_id=model_id, refit=refit, backend="gaopt")
+                         model_id=model_id, refit=refit, 
+                         cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                         parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                         save_compress=save_compress, save_oof=save_oof, 
+                         train_score=train_score, target_metric=target_metric, log_format=log_format, backend="gaopt", 
+                         n_parallel_trials=n_parallel_trials)
 
         self.max_iter = max_iter
         self.iter_pergeneration = iter_pergeneration
@@ -732,7 +1380,7 @@ class GAoptCV(BaseSearcher):
             self.random_state = np.random.RandomState(int(random_state))
 
     def fit(self, X, y=None, validation_data=None, groups=None, 
-            feature_groups=None, min_n_features=2):
+            feature_groups=None, min_n_features=2, resume=False):
         """
         Run fit.
 
@@ -760,26 +1408,41 @@ class GAoptCV(BaseSearcher):
             When number of X's feature cols is less than min_n_features, return search failure.
             
             e.g. If estimator has columns sampling function, use this option to avoid X become too small and error.
+
+        resume: bool, default=False.
+            When True, search is resumed from the log file({logdir}/cv_results/{model_id}.csv) of the same model_id.
+            Logged results are loaded and the backend optimizer's state is seeded from them, 
+            then max_iter new candidates are searched.
         """
-        X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups)
-        np.random.seed(self.random_state)
-
-        obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
-                         estimator=self.estimator, scoring=self.scoring, cv=cv, 
-                         param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
-                         score_summarizer=BaseSearcher.score_summarizer, 
-                         Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
-                         cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features)
-
-        try :
-            gamin(obj, param_distributions, max_iter=self.max_iter, iter_pergeneration=self.iter_pergeneration, 
-                  param_crossover_proba=self.param_crossover_proba, param_mutation_proba=self.param_mutation_proba, 
-                  random_sampling_proba=self.random_sampling_proba, cvsummarizer=self._cvs)
-        except KeyboardInterrupt:
-            pass
-
-        self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
-                           best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        try:
+            X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups, 
+                                                                            resume=resume)
+            np.random.seed(self.random_state)
+
+            obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
+                             estimator=self.estimator, scoring=self.scoring, cv=cv, 
+                             param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
+                             score_summarizer=BaseSearcher.score_summarizer, 
+                             Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
+                             cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features, 
+                             evalcache=self._evc, feature_cache_nbytes=int(self.feature_cache_mb*1024**2), 
+                             worker_feature_select=bool(self.memmap), pruner=self._pruner, parallel=self._parallel, 
+                             trial_timeout=self.trial_timeout, deadline=self._deadline, refit=self.refit, writer=self._writer, 
+                             oof_methods=self._oof_methods, train_score_mode=self.train_score)
+
+            try :
+                gamin(obj, param_distributions, max_iter=self.max_iter, iter_pergeneration=self.iter_pergeneration, 
+                      param_crossover_proba=self.param_crossover_proba, param_mutation_proba=self.param_mutation_proba, 
+                      random_sampling_proba=self.random_sampling_proba, cvsummarizer=self._cvs, 
+                      start_iter=len(self._cvs.cv_results_["params"]), n_parallel_trials=self.n_parallel_trials)
+            except (KeyboardInterrupt, TimeBudgetExceeded):
+                pass
+
+            self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
+                               best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        finally:
+            # Workers, writers and log files are released even if the search raises.
+            self._close_fit()
         return self
 
 
@@ -796,9 +1459,12 @@ class RandomoptCV(BaseSearcher):
     param_distributions: dict.
         Search space.
 
-    scoring: string or sklearn.metrics.make_scorer.
+    scoring: string, sklearn.metrics.make_scorer or dict.
         Evaluation index of search.
         When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
         
     cv: scikit-learn cross-validator or int(number of folds), default=5.
         Cross validation setting.
@@ -838,6 +1504,12 @@ class RandomoptCV(BaseSearcher):
         
         | ...
         
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
         |-estimators_{model_id}
         
             |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
@@ -855,6 +1527,8 @@ class RandomoptCV(BaseSearcher):
         
         2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
 
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
     model_id: str or None, default=None.
         This is used to log filename.
         When model_id is None, this is generated by date time.
@@ -862,6 +1536,107 @@ class RandomoptCV(BaseSearcher):
     refit: bool, default=True.
         Refit an estimator using the best found parameters on all train data(=X).
 
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    max_time: float, default=numpy.inf.
+        Time budget(sec) of fit. 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
+    n_parallel_trials: int, default=1.
+        Number of candidates which are evaluated concurrently.
+        All (candidate, cv fold) pairs are dispatched to n_jobs workers at once, 
+        so throughput scales with n_jobs rather than number of folds.
+
     Attributes
     ----------
     cv_results_ : dict of numpy (masked) ndarrays
@@ -876,15 +1651,30 @@ class RandomoptCV(BaseSearcher):
 
     best_params_ : dict
         Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
     """
     def __init__(self, estimator, param_distributions, 
                  scoring=None, cv=5, max_iter=32, 
                  random_state=None, n_jobs=1, pre_dispatch="2*n_jobs", 
-                 verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True):
+                 verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True, 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, max_time=np.inf, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv", 
+                 n_parallel_trials=1):
         super().__init__(estimator=estimator, param_distributions=param_distributions, 
                          scoring=scoring, cv=cv,  n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
                          verbose=verbose, logdir=logdir, save_estimator=save_estimator, 
-                         model_id=model_id, refit=refit, backend="gaopt")
+                         model_id=model_id, refit=refit, 
+                         cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                         parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                         save_compress=save_compress, save_oof=save_oof, 
+                         train_score=train_score, target_metric=target_metric, log_format=log_format, backend="gaopt", 
+                         n_parallel_trials=n_parallel_trials)
 
         self.max_iter = max_iter
         if random_state is None:
@@ -893,7 +1683,7 @@ class RandomoptCV(BaseSearcher):
             self.random_state = np.random.RandomState(int(random_state))
 
     def fit(self, X, y=None, validation_data=None, groups=None, 
-            feature_groups=None, min_n_features=2):
+            feature_groups=None, min_n_features=2, resume=False):
         """
         Run fit.
 
@@ -921,24 +1711,449 @@ class RandomoptCV(BaseSearcher):
             When number of X's feature cols is less than min_n_features, return search failure.
             
             e.g. If estimator has columns sampling function, use this option to avoid X become too small and error.
+
+        resume: bool, default=False.
+            When True, search is resumed from the log file({logdir}/cv_results/{model_id}.csv) of the same model_id.
+            Logged results are loaded and the backend optimizer's state is seeded from them, 
+            then max_iter new candidates are searched.
         """
-        X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups)
-        np.random.seed(self.random_state)
-
-        obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
-                         estimator=self.estimator, scoring=self.scoring, cv=cv, 
-                         param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
-                         score_summarizer=BaseSearcher.score_summarizer, 
-                         Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
-                         cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features)
-
-        try :
-            gamin(obj, param_distributions, max_iter=self.max_iter, iter_pergeneration=1, 
-                  param_crossover_proba=0, param_mutation_proba=0, 
-                  random_sampling_proba=1, cvsummarizer=self._cvs)
-        except KeyboardInterrupt:
-            pass
-
-        self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
-                           best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
-        return self
\ No newline at end of file
+        try:
+            X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups, 
+                                                                            resume=resume)
+            np.random.seed(self.random_state)
+
+            obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
+                             estimator=self.estimator, scoring=self.scoring, cv=cv, 
+                             param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
+                             score_summarizer=BaseSearcher.score_summarizer, 
+                             Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
+                             cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features, 
+                             evalcache=self._evc, feature_cache_nbytes=int(self.feature_cache_mb*1024**2), 
+                             worker_feature_select=bool(self.memmap), pruner=self._pruner, parallel=self._parallel, 
+                             trial_timeout=self.trial_timeout, deadline=self._deadline, refit=self.refit, writer=self._writer, 
+                             oof_methods=self._oof_methods, train_score_mode=self.train_score)
+
+            try :
+                # Random sampling doesn't depend on results, so all candidates in a generation can be evaluated concurrently.
+                gamin(obj, param_distributions, max_iter=self.max_iter, iter_pergeneration=self.n_parallel_trials, 
+                      param_crossover_proba=0, param_mutation_proba=0, 
+                      random_sampling_proba=1, cvsummarizer=self._cvs, start_iter=len(self._cvs.cv_results_["params"]), 
+                      n_parallel_trials=self.n_parallel_trials)
+            except (KeyboardInterrupt, TimeBudgetExceeded):
+                pass
+
+            self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
+                               best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        finally:
+            # Workers, writers and log files are released even if the search raises.
+            self._close_fit()
+        return self
+
+
+
+class HalvingoptCV(BaseSearcher):
+    """
+    Cross validation optimizer by Successive Halving(or Hyperband).
+
+    Randomly sampled candidates are evaluated on small subsamples(budget) of each cv fold, 
+    and only the top 1/factor candidates are promoted to the next rung whose budget is factor times larger.
+    In the last rung, candidates are evaluated on all samples.
+    Results are logged with budget(fraction of samples) and rung, 
+    and the best is selected from the results of the largest budget.
+
+    When budget_param is set, the value of this estimator's param(e.g. n_estimators) is used as budget instead of samples.
+
+    Parameters
+    ----------
+    estimator
+        scikit-learn estimator like.
+
+    param_distributions: dict.
+        Search space.
+
+    scoring: string, sklearn.metrics.make_scorer or dict.
+        Evaluation index of search.
+        When scoring is None, use stimator default scorer and this score greater is better.
+        When scoring is dict(key: metric name, value: string or scorer), all metrics are computed 
+        from one prediction per fold and the target metric(see target_metric) is optimized. 
+        The other metrics are logged in columns such as mean_test_{name} and split{i}_test_{name}.
+        
+    cv: scikit-learn cross-validator or int(number of folds), default=5.
+        Cross validation setting.
+
+    max_iter: int, default=32.
+        Number of sampled candidates.
+        (Number of search is larger than this because promoted candidates are evaluated again.)
+
+    random_state: int or None, default=None.
+        The seed used by the random number generator.
+
+    n_jobs: int, default=1.
+        Number of jobs to run in parallel.
+
+    pre_dispatch: int or string, default="2*n_jobs".
+        Controls the number of jobs that get dispatched during parallel.
+
+    verbose: int(0, 1 or 2), default=0.
+        Controls the verbosity
+        
+        0: don't display status.
+
+        1: display status by stdout.
+        
+        2: display status by graph.
+
+    logdir: str or None, default=None.
+        Path of directory to save log file.
+        When logdir is None,  log is not saved.
+        
+        [directory structure]
+        
+        logdir
+        
+        |-cv_results
+        
+        | |-{model_id}.csv                                      : search log
+        
+        | ...
+        
+        |-eval_store
+        
+        | |-{fingerprint}.pkl                                   : persistent evaluation store(eval_store=True)
+        
+        | ...
+        
+        |-estimators_{model_id}
+        
+            |-{model_id}_index{search count}_split{fold count}.pkl: an estimator which is fitted fold train data
+            
+            ...
+            
+            |-{model_id}_index{search count}_test.pkl             : an estimator which is fitted whole train data.
+
+    save_estimator: int, default=0.
+        estimator save setting.
+        
+        0: An estimator is not saved.
+        
+        1: An estimator which is fitted fold train data is saved per cv-fold.
+        
+        2: In addition to 1, an estimator which is fitted whole train data is saved per cv.
+
+        Estimators are saved in background thread(the search does not wait for disk I/O) and all of them are saved at the end of fit.
+
+    model_id: str or None, default=None.
+        This is used to log filename.
+        When model_id is None, this is generated by date time.
+
+    refit: bool, default=True.
+        Refit an estimator using the best found parameters on all train data(=X).
+
+    cache: bool or float, default=False.
+        Evaluation cache setting.
+        When True, a candidate whose params(including feature select) is same as already evaluated one is not fitted again, 
+        and stored cv scores is reused (logged with cache_hit=True).
+
+        When float, float params whose absolute difference is within this value are regarded as same.
+
+    eval_store: bool, default=False.
+        Persistent evaluation store setting(logdir is required).
+        When True, cv results are also saved in {logdir}/eval_store, 
+        and a candidate which is evaluated in the past run whose X, y, cv splits, estimator and scoring are same is not fitted again.
+
+        This is useful to resume or re-run a search.
+
+    feature_cache_mb: float, default=0.
+        Memory budget(MB) to cache feature selected X across candidates(used when feature_groups is input).
+        Recently used feature selected X is kept within this budget and reused by the candidate whose feature select is same.
+
+    memmap: bool or str, default=False.
+        When True, X, y and validation_data are dumped to a temporary folder once at the start of fit and memory-mapped 
+        (scipy.sparse's component arrays are also memory-mapped). 
+        Workers receive only references to them with cv fold and feature select indices, 
+        so X is not pickled per candidate and memory usage is one copy of data regardless of n_jobs.
+        When str, the temporary folder is made in this path.
+
+    pruner: str, cvopt.model_selection.BasePruner or None, default=None.
+        Fold-level early stopping setting.
+        When pruner is set, cv folds are evaluated progressively(about n_jobs folds at a time), 
+        and the candidate which can not beat the current best is stopped before all folds are evaluated.
+        The stopped candidate is logged with pruned=True and the scores of finished folds 
+        (summarized test score is nan), and backend receives the score of finished folds.
+
+        * `median`: MedianPruner(). Stop when the score is worse than the median of completed candidates at the same folds.
+
+        * `threshold`: ThresholdPruner(). Stop when the score is worse than the best score by more than 10%.
+
+    parallel_backend: str, joblib's ParallelBackendBase or None, default=None.
+        joblib backend to run cv folds in parallel("loky", "multiprocessing", "threading", ...).
+        When None, joblib's default backend is used.
+        Workers are started once per fit and reused by all candidates.
+
+    trial_timeout: float or None, default=None.
+        Time limit(sec) per candidate. 
+        The candidate which exceeds it is stopped and logged as failure with timed_out=True 
+        (scores of its finished folds are kept), and backend receives the failed score.
+        Time of a candidate is counted only while its cv folds are running(waiting for the other candidates is not counted), 
+        and the candidate whose all folds are finished is never regarded as timed out.
+
+        When trial_timeout is set, cv folds are dispatched in rounds of about n_jobs folds.
+        Running cv folds are stopped by joblib's timeout and worker processes are restarted.
+        When n_jobs=1 or parallel_backend="threading", running fit can not be stopped,
+        so the candidate is judged after the running folds are finished.
+
+    max_time: float, default=numpy.inf.
+        Time budget(sec) of fit. 
+        New candidate is not evaluated when it is estimated that the candidate(and refit) can not finish within the budget.
+        (Elapsed time of the candidate is estimated from the log.)
+        Candidates evaluated concurrently(n_parallel_trials) are checked as a batch which shares n_jobs workers, 
+        and the batch is trimmed to the candidates which can finish.
+
+    deadline: datetime.datetime or None, default=None.
+        Time by which fit(including refit) must be finished. This works in the same way as max_time.
+
+    save_compress: int(0-9) or bool, default=0.
+        Compress level of saved estimators(joblib.dump's compress).
+
+    save_oof: bool, str or list of str, default=False.
+        When not False, out-of-fold predictions(and predictions of validation data) of each candidate are saved 
+        in {logdir}/oof/{model_id} as numpy file. 
+        Values are estimator's method names(e.g. "predict_proba"). True means "predict".
+        Saved predictions are used in cvopt.utils.mk_metafeature without loading estimators.
+        (Predictions are not saved for pruned candidates and candidates evaluated by sample budget of HalvingoptCV.)
+
+    train_score: str, default="always".
+        When to compute scores of train data(mean_train_score, split*_train_score and train_score(whole)).
+        Skipping them reduces predictions on large train data.
+
+        * `always`: Computed for all candidates.
+
+        * `never`: Not computed(stored as nan).
+
+        * `best_only`: Computed only for the candidates which become the best, using fitted fold estimators.
+
+    target_metric: str or None, default=None.
+        Metric name(key of scoring) which is optimized when scoring is dict. When None, the first key is used.
+
+    log_format: str, default="csv".
+        Format of log file in {logdir}/cv_results.
+
+        * `csv`: {model_id}.csv
+
+        * `store`: Indexed log store({model_id}.store directory). Rows are appended as JSON lines with offset index 
+          and numeric columns are also stored per column, so extract_params and mk_metafeature read only the target row.
+
+        * `both`: Both of them.
+
+    n_parallel_trials: int, default=1.
+        Number of candidates which are evaluated concurrently.
+        All (candidate, cv fold) pairs are dispatched to n_jobs workers at once, 
+        so throughput scales with n_jobs rather than number of folds.
+
+    factor: int or float, default=3.
+        Proportion of candidates that are promoted and growth rate of budget per rung.
+
+    min_budget: float or None, default=None.
+        Budget(fraction of samples in each cv fold) of the first rung. 
+        Budgets are factor**(-k) (k = 0, 1, ..) which are not smaller than min_budget.
+        When min_budget is None, this is set so that about 1 candidate remains in the last rung.
+
+    budget_param: str or None, default=None.
+        Name of the param in param_distributions which is used as budget(e.g. n_estimators, max_iter).
+        This param must be set by search_numeric or search_category, 
+        and budget of each rung is (the largest value of the param) * factor**(-k) (not smaller than the smallest value).
+        When the param is set by search_category, budget is snapped to the nearest category(categories must be numbers).
+        Candidates are sampled without this param.
+
+        When estimator has warm_start, promoted candidates are continued from the estimators per cv fold 
+        which were fitted in the previous rung(warm_start=True) instead of fitting from scratch.
+
+    hyperband: bool, default=False.
+        When True, search is run by Hyperband: 
+        successive halving brackets whose first budgets are different are run in turn 
+        until max_iter candidates are sampled.
+
+    Attributes
+    ----------
+    cv_results_ : dict of numpy (masked) ndarrays
+        A dict with keys as column headers and values as columns, that can be
+        imported into a pandas ``DataFrame``.
+
+    best_estimator_ : estimator or dict
+        Estimator that was chosen by the search.
+
+    best_score_ : float
+        Cross-validated score of the best_estimator.
+
+    best_params_ : dict
+        Parameter setting that gave the best results on the hold out data.
+
+    top_k_params_ : list of dict
+        Parameter settings of the top k(CVSummarizer.top_k, default=10) trials. The best is first.
+
+    top_k_scores_ : list of float
+        Cross-validated scores of top_k_params_.
+    """
+    def __init__(self, estimator, param_distributions, 
+                 scoring=None, cv=5, max_iter=32, 
+                 random_state=None, n_jobs=1, pre_dispatch="2*n_jobs", 
+                 verbose=0, logdir=None, save_estimator=0, model_id=None, refit=True, 
+                 cache=False, eval_store=False, feature_cache_mb=0, memmap=False, pruner=None, parallel_backend=None, 
+                 trial_timeout=None, max_time=np.inf, deadline=None, save_compress=0, 
+                 save_oof=False, train_score="always", target_metric=None, log_format="csv", 
+                 n_parallel_trials=1, factor=3, min_budget=None, hyperband=False, budget_param=None):
+        super().__init__(estimator=estimator, param_distributions=param_distributions, 
+                         scoring=scoring, cv=cv,  n_jobs=n_jobs, pre_dispatch=pre_dispatch, 
+                         verbose=verbose, logdir=logdir, save_estimator=save_estimator, 
+                         model_id=model_id, refit=refit, 
+                         cache=cache, eval_store=eval_store, feature_cache_mb=feature_cache_mb, memmap=memmap, pruner=pruner, 
+                         parallel_backend=parallel_backend, trial_timeout=trial_timeout, max_time=max_time, deadline=deadline, 
+                         save_compress=save_compress, save_oof=save_oof, 
+                         train_score=train_score, target_metric=target_metric, log_format=log_format, backend="gaopt", 
+                         n_parallel_trials=n_parallel_trials)
+
+        self.max_iter = max_iter
+        self.factor = factor
+        self.min_budget = min_budget
+        self.hyperband = hyperband
+        self.budget_param = budget_param
+        self.random_state = random_state
+
+    def fit(self, X, y=None, validation_data=None, groups=None, 
+            feature_groups=None, min_n_features=2, resume=False):
+        """
+        Run fit.
+
+        Parameters
+        ----------       
+        X :numpy.array, pandas.DataFrame or scipy.sparse, shape(axis=0) = (n_samples)
+            Features. Detail depends on estimator.
+
+        y: np.ndarray or pd.core.frame.DataFrame, shape(axis=0) = (n_samples) or None, default=None.
+            Target variable. detail depends on estimator.
+
+        validation_data: tuple(X, y) or None, default=None.
+            Data to compute validation score. detail depends on estimator.
+            When validation_data is None, computing validation score is not run.
+
+        groups: array-like, shape = (n_samples,)  or None, default=None.
+            Group labels for the samples used while splitting the dataset into train/test set.
+            (input of scikit-learn cross-validator)
+
+        feature_groups: array-like, shape = (n_samples,) or None, default=None.
+            Group labels for the features used while fearture select.
+            When feature_groups is None, fearture selection is not run.
+
+        min_n_features: int, default=2.
+            When number of X's feature cols is less than min_n_features, return search failure.
+            
+            e.g. If estimator has columns sampling function, use this option to avoid X become too small and error.
+
+        resume: bool, default=False.
+            When True, search is resumed from the log file({logdir}/cv_results/{model_id}.csv) of the same model_id.
+            Logged results are loaded, then max_iter new candidates are searched(interrupted bracket is not continued).
+        """
+        try:
+            X, y, Xvalid, yvalid, cv, param_distributions = self._preproc_fit(X=X, y=y, validation_data=validation_data, feature_groups=feature_groups, 
+                                                                            resume=resume)
+            np.random.seed(self.random_state)
+            if self.budget_param is None:
+                to_budget = lambda x: x
+            else:
+                to_budget = self._mk_budget_func()
+                param_distributions = {key:param_distributions[key] for key in param_distributions if key != self.budget_param}
+
+            obj = mk_objfunc(X=X, y=y, groups=groups, feature_groups=feature_groups, feature_axis=BaseSearcher.feature_axis, 
+                             estimator=self.estimator, scoring=self.scoring, cv=cv, 
+                             param_distributions=param_distributions, backend=self.backend, failedscore=np.nan, 
+                             score_summarizer=BaseSearcher.score_summarizer, 
+                             Xvalid=Xvalid, yvalid=yvalid, n_jobs=self.n_jobs, pre_dispatch=self.pre_dispatch, 
+                             cvsummarizer=self._cvs, save_estimator=self.save_estimator, min_n_features=min_n_features, 
+                             evalcache=self._evc, feature_cache_nbytes=int(self.feature_cache_mb*1024**2), 
+                             worker_feature_select=bool(self.memmap), pruner=self._pruner, parallel=self._parallel, 
+                             trial_timeout=self.trial_timeout, deadline=self._deadline, refit=self.refit, writer=self._writer, 
+                             oof_methods=self._oof_methods, train_score_mode=self.train_score, 
+                             budget_param=self.budget_param, max_budget=to_budget(1.0))
+
+            try :
+                for n_candidates, budgets in self._mk_brackets():
+                    candidates = [get_params(param_distributions, tgt_key=None) for _ in range(n_candidates)]
+                    for rung, budget in enumerate(budgets):
+                        budget = to_budget(budget)
+                        if self.budget_param is None:
+                            params = candidates
+                        else:
+                            params = [dict(candidate, **{self.budget_param:budget}) for candidate in candidates]
+
+                        losses, stopped = [], []
+                        for i in range(0, len(params), self.n_parallel_trials):
+                            ret, ret_stopped = obj(params[i:i+self.n_parallel_trials], budget=budget, rung=rung, return_stopped=True)
+                            losses.extend(ret)
+                            stopped.extend(ret_stopped)
+
+                        # Promote top candidates(failed candidate's loss is nan). 
+                        # Pruned or timed out candidates are not promoted because their loss is not the score of all cv folds.
+                        n_promoted = max(int(len(candidates) / self.factor), 1)
+                        losses = np.where(np.isnan(losses) | np.array(stopped, dtype=bool), np.inf, losses)
+                        order = np.argsort(losses, kind="mergesort")
+                        candidates = [candidates[j] for j in order[:n_promoted]]
+            except (KeyboardInterrupt, TimeBudgetExceeded):
+                pass
+
+            self._postproc_fit(X=X, y=y, feature_groups=feature_groups, 
+                               best_params=self._cvs.best_params_, best_score=self._cvs.best_score_)
+        finally:
+            # Workers, writers and log files are released even if the search raises.
+            self._close_fit()
+        return self
+
+    def _mk_budget_func(self):
+        """
+        Make function to convert budget(fraction) to the value of budget_param.
+        """
+        param_dist = self._raw_param_distributions.get(self.budget_param)
+        if type(param_dist) != ParamDist:
+            raise Exception("`budget_param` must be a param in param_distributions which is set by search_numeric or search_category.")
+        if param_dist["valtype"] == "numeric":
+            low, high, dtype = param_dist["low"], param_dist["high"], param_dist["dtype"]
+            categories = None
+        else:
+            categories = param_dist["categories"]
+            if not all([isinstance(i, numbers.Real) and (not isinstance(i, (bool, np.bool_))) for i in categories]):
+                raise Exception("`budget_param`'s categories must be numbers.")
+            low, high = min(categories), max(categories)
+
+        def to_budget(x):
+            if categories is not None:
+                # Budget is snapped to the nearest category.
+                return min(categories, key=lambda i: abs(i - x*high))
+            elif dtype == "int":
+                return int(max(low, np.round(x*high)))
+            else:
+                return float(max(low, x*high))
+        return to_budget
+
+    def _mk_brackets(self):
+        """
+        Make list of (number of candidates, budgets per rung).
+        """
+        if self.min_budget is None:
+            n_rungs = int(np.floor(np.log(max(self.max_iter, 1)) / np.log(self.factor) + 1e-9)) + 1
+        else:
+            n_rungs = int(np.floor(np.log(1 / self.min_budget) / np.log(self.factor) + 1e-9)) + 1
+        budgets = [float(self.factor)**(k-n_rungs+1) for k in range(n_rungs)]
+
+        if not self.hyperband:
+            return [(self.max_iter, budgets)]
+
+        brackets = []
+        n_sampled = 0
+        while n_sampled < self.max_iter:
+            for s in range(n_rungs-1, -1, -1):
+                n_candidates = int(np.ceil(n_rungs / (s+1) * self.factor**s))
+                n_candidates = min(n_candidates, self.max_iter-n_sampled)
+                brackets.append((n_candidates, budgets[n_rungs-1-s:]))
+                n_sampled += n_candidates
+                if n_sampled >= self.max_iter:
+                    break
+        return brackets
@@ -182,3 +182,53 @@ def decode_params(params, param_distributions, backend):
         return ret  
     elif backend == "gaopt":
         return params
+
+
+
+def _encode_category(value, categories):
+    for i, category in enumerate(categories):
+        if (category == value) or (str(category) == str(value)):
+            return i
+    raise ValueError(str(value)+" is not in categories.")
+
+def chk_encodable(param_distributions, backend):
+    """
+    Check that params of param_distributions can be encoded by encode_params(search can be resumed).
+
+    hyperopt's native space(hp.*) can not be encoded, so param_distributions must be cvopt style 
+    (search_numeric, search_category) to resume HyperoptCV. 
+    GPyOpt's native space(dict) and scipy.stats class can be resumed.
+    """
+    if backend == "hyperopt":
+        for param_name in param_distributions:
+            if type(param_distributions[param_name]) != ParamDist:
+                raise ValueError("parameter:"+ param_name + " is not cvopt style. It could not be encoded"
+                                 "(use search_numeric or search_category to resume search).")
+
+def encode_params(params, param_distributions, backend):
+    """
+    Encode params from dict(key:param name, value:param value) to backend style(inverse of decode_params).
+
+    param_distributions must be cvopt style(before conv_param_distributions).
+    """
+    if backend == "hyperopt":
+        # Return misc vals. hp.choice is encoded to index of categories.
+        chk_encodable(param_distributions, backend=backend)
+        ret = {}
+        for param_name in param_distributions:
+            param_dist = param_distributions[param_name]
+            if param_dist["valtype"] == "category":
+                ret[param_name] = _encode_category(params[param_name], param_dist["categories"])
+            else:
+                ret[param_name] = params[param_name]
+        return ret
+    elif backend == "bayesopt":
+        ret = []
+        for param_dist in conv_param_distributions(param_distributions, backend="bayesopt"):
+            if param_dist["type"]=="categorical":
+                ret.append(_encode_category(params[param_dist["name"]], param_dist["categories"]))
+            else:
+                ret.append(params[param_dist["name"]])
+        return np.array([ret], dtype=float)
+    elif backend == "gaopt":
+        return params
@@ -1,4 +1,4 @@
 # coding: utf-8
-from ._logoperator import extract_params, mk_metafeature
+from ._logoperator import extract_params, mk_metafeature, mk_metafeatures
 
-__all__ = ("extract_params", "mk_metafeature")
\ No newline at end of file
+__all__ = ("extract_params", "mk_metafeature", "mk_metafeatures")
\ No newline at end of file
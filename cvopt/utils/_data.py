@@ -0,0 +1,95 @@
+import os, scipy
+import numpy as np
+from collections import OrderedDict
+from sklearn.externals.joblib import dump, load
+
+from ._base import compress
+
+
+def get_nbytes(a):
+    """
+    Get memory size of numpy.array or scipy.sparse.
+    """
+    if scipy.sparse.issparse(a):
+        nbytes = 0
+        for attr in ["data", "indices", "indptr", "row", "col", "offsets"]:
+            if hasattr(a, attr):
+                nbytes += getattr(a, attr).nbytes
+        return nbytes
+    else:
+        return a.nbytes
+
+
+def to_memmap(Xy, folder, name):
+    """
+    Dump Xy to folder and load it as memory map.
+
+    When Xy is scipy.sparse, its component arrays are memory-mapped.
+    Memory-mapped array is passed to joblib workers as a reference to the file (not a copy).
+    """
+    if Xy is None:
+        return None
+    path = os.path.join(folder, str(name)+".pkl")
+    dump(Xy, path)
+    return load(path, mmap_mode="r")
+
+
+class DataPlane:
+    """
+    Give feature selected X.
+
+    When all features are selected, X itself is returned (no copy).
+    Otherwise feature selected X is made and cached in LRU manner within max_nbytes.
+
+    Parameters
+    ----------
+    X: numpy.array or scipy.sparse
+        Base data.
+
+    feature_axis: int
+        feature_select target axis.
+
+    max_nbytes: int, default=0.
+        Memory budget(bytes) of cache. When 0, feature selected X is not cached.
+    """
+    def __init__(self, X, feature_axis, max_nbytes=0):
+        self.X = X
+        self.feature_axis = feature_axis
+        self.max_nbytes = max_nbytes
+        self.nbytes = 0
+        self._cache = OrderedDict()
+
+    def _mk_key(self, feature_select_ind):
+        return np.packbits(feature_select_ind).tobytes()
+
+    def get(self, feature_select_ind):
+        feature_select_ind = np.asarray(feature_select_ind, dtype=bool)
+        if feature_select_ind.all():
+            return self.X
+
+        key = self._mk_key(feature_select_ind)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        Xs = compress(feature_select_ind, self.X, axis=self.feature_axis)
+        nbytes = get_nbytes(Xs)
+        if nbytes <= self.max_nbytes:
+            self._cache[key] = Xs
+            self.nbytes += nbytes
+            while self.nbytes > self.max_nbytes:
+                _, old = self._cache.popitem(last=False)
+                self.nbytes -= get_nbytes(old)
+        return Xs
+
+    def shape(self, feature_select_ind):
+        """
+        Shape of feature selected X (X is not copied).
+        """
+        shape = list(self.X.shape)
+        shape[self.feature_axis] = int(np.sum(feature_select_ind))
+        return tuple(shape)
+
+    def clear(self):
+        self._cache = OrderedDict()
+        self.nbytes = 0
@@ -1,9 +1,7 @@
-import os, sys, warnings, time, copy
+import os, sys, warnings, time, threading, heapq, numbers
 import pandas as pd, numpy as np
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestRegressor
 
 from bokeh import layouts
 from bokeh.io import output_notebook, push_notebook, show
@@ -13,6 +11,10 @@ from bokeh.models.ranges import DataRange1d, FactorRange
 from bokeh.models.widgets import Div
 
 from ._base import mk_dir
+from ._logstore import LogStore
+from ._results import ResultColumns
+from ._runtime import RuntimeModel
+from ._writer import CSVWriter
 from ..model_selection import _setting as st
 
 class CVSummarizer:
@@ -30,22 +32,63 @@ class CVSummarizer:
     sign: 1 or -1.
         Attribute of sklearn.metrics.make_scorer .
         Flag whether greater is better or not.
+
+    train: bool, default=True.
+        Flag whether train scores are computed or not. 
+        When False, train score columns are kept as nan and are not visualized.
+
+    log_format: str, default="csv".
+        Format of log file. "csv"({logdir}/cv_results/{model_id}.csv), 
+        "store"(cvopt.utils._logstore.LogStore in {logdir}/cv_results/{model_id}.store) or "both".
+
+    metrics: OrderedDict or None, default=None.
+        key: name, value: sign of the metrics which are computed in addition to the target score(multi-metric scoring).
+        Their scores are stored in {summarizer}_test_{name}, split{i}_test_{name}, validation_{name} and so on.
+
+    Class Variables
+    ---------------
+    csv_flush_interval: float, default=1.0.
+        Interval(sec) of flushing csv log file. Buffered rows are flushed by a background timer within this interval, 
+        and log file is also flushed and fsynced when close is called(end of fit, even if fit raises).
+
+    csv_fsync_interval: float, default=10.0.
+        Interval(sec) of fsync of csv log file.
+
+    top_k: int, default=10.
+        Number of the best trials kept in top_k_params_ and top_k_scores_.
+
+    runtime_model: callable, default=cvopt.utils._runtime.RuntimeModel.
+        Factory of the model which predicts elapsed time of the next trial(used by display_status and deadline).
+        Made object must have update(params, elapsed_time) and predict(params).
     """
+    csv_flush_interval = 1.0
+    csv_fsync_interval = 10.0
+    top_k = 10
+    runtime_model = RuntimeModel
+
     def __init__(self, paraname_list, cvsize, score_summarizer, score_summarizer_name, valid, 
-                 sign, model_id, verbose, save_estimator, logdir=None):
+                 sign, model_id, verbose, save_estimator, logdir=None, train=True, metrics=None, log_format="csv"):
         self.score_summarizer = score_summarizer
         self.score_summarizer_name = str(score_summarizer_name)
         self.valid = valid
+        self.train = train
+        self.metrics = OrderedDict() if metrics is None else OrderedDict(metrics)
         self.sign = sign
         self.model_id = str(model_id)
 
         self.verbose = verbose
         self.save_estimator = save_estimator
         self.logdir = logdir
+        if not log_format in ["csv", "store", "both"]:
+            raise Exception("`log_format` "+str(log_format)+" is not supported.")
+        self.log_format = log_format
+        self.log_store = None
         if self.logdir is not None:
             path = os.path.join(self.logdir, "cv_results")
             mk_dir(path, error_level=0)
             self.save_path = os.path.join(path, str(self.model_id))
+            if log_format in ["store", "both"]:
+                self.log_store = LogStore(self.save_path+".store")
             
             if (save_estimator > 0):
                 mk_dir(os.path.join(self.logdir, "estimators", self.model_id), 
@@ -54,29 +97,118 @@ class CVSummarizer:
         self.params_keys = ["param_" + str(i) for i in paraname_list]
         self.train_score_keys = ["split"+str(i)+"_train_score" for i in range(cvsize)]
         self.test_score_keys = ["split"+str(i)+"_test_score" for i in range(cvsize)]
-        self.cv_results_ = OrderedDict({"index":[], "params":[]})
+        # cv_results_ is the dict interface of columnar storage(numeric columns are numpy arrays).
+        self._results = ResultColumns(columns=["index", "params"])
+        self.cv_results_ = self._results.results
+        self._row = None
         self.next_elapsed_time = np.nan
+        self._runtime_model = CVSummarizer.runtime_model()
         self.nbv = None
 
         self.best_params_ = None
         self.best_score_ = np.nan
+        self.best_index_ = None
+        # key: budget(None when not multi-fidelity), value: heap of (sign*score, -index) of the top k trials.
+        self._top_k_heaps = {}
+        # key: budget, value: (sign*score, index) of the best trial.
+        self._bests = {}
+        self._lock = threading.Lock()
+        self._csv_writer = None
 
     def __call__(self):
         return self.cv_results_
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        # File handle is not picklable(rows are appended by a new writer).
+        state["_csv_writer"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
     def _store(self, key, value):
-        if key in self.cv_results_:
-            self.cv_results_[key].append(value)
-        else:
-            self.cv_results_[key] = [value]
+        # Values are collected to a row and appended at once(see _store_cv_result).
+        # When results are loaded from old log file, some columns may not exist(previous rows are nan).
+        self._row[key] = value
+
+    def load(self):
+        """
+        Load cv results from log file({logdir}/cv_results/{model_id}.csv) to resume search.
+
+        Returns
+        -------
+        n_loaded: int
+            Number of loaded results.
+        """
+        if self.logdir is not None:
+            csv_exists = os.path.isfile(self.save_path+".csv")
+            store_exists = LogStore.exists(self.save_path+".store")
+        if (self.logdir is None) or ((not csv_exists) and (not store_exists)):
+            warnings.warn("Log file to resume is not found. Search is started from the beginning.")
+            return 0
+        if store_exists and ((self.log_format == "store") or (not csv_exists)):
+            return self._load_store()
+
+        df = pd.read_csv(self.save_path+".csv", encoding="cp932")
+        namespace = {"np":np, "nan":np.nan, "inf":np.inf}
+        params = [eval(i, namespace) for i in df["params"]]
+        for col in df.columns:
+            if col == "params":
+                values = params
+            elif col in self.params_keys:
+                values = [i.get(col.split("param_", 1)[1], np.nan) for i in params]
+            elif col in ["start_time", "end_time"]:
+                values = list(pd.to_datetime(df[col]).dt.to_pydatetime())
+            elif col == "X_shape":
+                values = [eval(i, namespace) for i in df[col]]
+            else:
+                values = df[col].tolist()
+            self._results.set_column(col, values)
+        
+        self._update_best()
+        self._update_runtime_model()
+        return len(df)
+
+    def _load_store(self):
+        rows = list(LogStore(self.save_path+".store"))
+        columns = OrderedDict()
+        for row in rows:
+            for key in row:
+                columns[key] = None
+        for key in columns:
+            self._results.set_column(key, [row.get(key, np.nan) for row in rows])
+
+        self._update_best()
+        self._update_runtime_model()
+        return len(rows)
 
     def _save(self):
-        if self.logdir is not None:    
-            if len(pd.DataFrame(self.cv_results_)) == 1:
-                if os.path.isfile(self.save_path+".csv"):
+        if (self.logdir is not None) and (self.log_format in ["csv", "both"]):
+            if self._csv_writer is None:
+                if (len(self.cv_results_["index"]) == 1) and os.path.isfile(self.save_path+".csv"):
                     warnings.warn("A log file(%s) is already exist. cv result is append to this file" %self.save_path+".csv")
-            pd.DataFrame(self.cv_results_).iloc[[-1]].to_csv(self.save_path+".csv", index=False, encoding="cp932", 
-                                                             mode="a", header=(len(pd.DataFrame(self.cv_results_))==1))
+                self._csv_writer = CSVWriter(self.save_path+".csv", encoding="cp932", 
+                                             flush_interval=CVSummarizer.csv_flush_interval, 
+                                             fsync_interval=CVSummarizer.csv_fsync_interval)
+            # Only the last row is written.
+            self._csv_writer.write([self.cv_results_[key][-1] for key in self.cv_results_], header=list(self.cv_results_.keys()))
+        if self.log_store is not None:
+            if (len(self.cv_results_["index"]) == 1) and (len(self.log_store) > 0):
+                warnings.warn("A log store(%s) is already exist. cv result is append to this store" %self.log_store.path)
+            self.log_store.append(OrderedDict([(key, self.cv_results_[key][-1]) for key in self.cv_results_]))
+
+    def close(self):
+        """
+        Flush and close log file.
+        """
+        if self._csv_writer is not None:
+            self._csv_writer.close()
+            self._csv_writer = None
+        if self.nbv is not None:
+            self.nbv.flush(cv_results=self.cv_results_)
 
     def _init_score(self, cv_train_scores, cv_test_scores, train_score, validation_score):
         if self.sign == 1:
@@ -88,23 +220,113 @@ class CVSummarizer:
             validation_score = -1*validation_score
             return cv_train_scores, cv_test_scores, train_score, validation_score
 
-    def _update_best(self):
-        if not np.isnan(self.cv_results_[self.score_summarizer_name+"_test_score"]).all():
-            if self.sign == 1:
-                index = np.nanargmax(self.cv_results_[self.score_summarizer_name+"_test_score"])
-            else:
-                index = np.nanargmin(self.cv_results_[self.score_summarizer_name+"_test_score"])
+    def _track_best(self, index):
+        """
+        Update the best and the top k of the budget of the trial(index) in O(log k).
+        """
+        score = float(self.cv_results_[self.score_summarizer_name+"_test_score"][index])
+        if np.isnan(score):
+            return
+        budget = np.nan
+        if "budget" in self.cv_results_:
+            budget = float(self.cv_results_["budget"][index])
+        budget = None if np.isnan(budget) else budget
+
+        # On ties, the earlier trial is kept.
+        key = self.sign*score
+        if (not budget in self._bests) or (key > self._bests[budget][0]):
+            self._bests[budget] = (key, index)
+        heap = self._top_k_heaps.setdefault(budget, [])
+        if len(heap) < CVSummarizer.top_k:
+            heapq.heappush(heap, (key, -index))
+        elif CVSummarizer.top_k > 0:
+            heapq.heappushpop(heap, (key, -index))
+
+    def _target_budget(self):
+        # In multi-fidelity search, the best is selected from the results of the largest budget.
+        budgets = [i for i in self._bests if i is not None]
+        if len(budgets) > 0:
+            return max(budgets)
+        return None
+
+    def _update_best(self, index=None):
+        """
+        Update the best by the trial(index). When index is None(e.g. results are loaded), all trials are scanned.
+        """
+        if index is None:
+            self._top_k_heaps, self._bests = {}, {}
+            for i in range(len(self.cv_results_["params"])):
+                self._track_best(i)
+        else:
+            self._track_best(index)
 
+        budget = self._target_budget()
+        if budget in self._bests:
+            index = self._bests[budget][1]
+            self.best_index_ = index
             self.best_params_ = self.cv_results_["params"][index]
             self.best_score_ = self.cv_results_[self.score_summarizer_name+"_test_score"][index]
+
+    @property
+    def top_k_index_(self):
+        """
+        Indexes of the top k trials(the best is first).
+        """
+        heap = self._top_k_heaps.get(self._target_budget(), [])
+        return [-i for _, i in sorted(heap, reverse=True)]
+
+    @property
+    def top_k_params_(self):
+        return [self.cv_results_["params"][i] for i in self.top_k_index_]
+
+    @property
+    def top_k_scores_(self):
+        return [self.cv_results_[self.score_summarizer_name+"_test_score"][i] for i in self.top_k_index_]
             
     def store_cv_result(self, cv_train_scores, cv_test_scores, params, fit_times, score_times, 
                         feature_select, X_shape, start_time,
-                        end_time, train_score, validation_score):
+                        end_time, train_score, validation_score, cache_hit=False, pruned=False, budget=None, rung=None, 
+                        timed_out=False, metric_scores=None):
+        # Results may be stored from multiple threads when candidates are evaluated concurrently.
+        with self._lock:
+            self._store_cv_result(cv_train_scores=cv_train_scores, cv_test_scores=cv_test_scores, params=params, 
+                                  fit_times=fit_times, score_times=score_times, feature_select=feature_select, 
+                                  X_shape=X_shape, start_time=start_time, end_time=end_time, 
+                                  train_score=train_score, validation_score=validation_score, cache_hit=cache_hit, 
+                                  pruned=pruned, budget=budget, rung=rung, timed_out=timed_out, metric_scores=metric_scores)
+
+    def _store_metric_scores(self, metric_scores):
+        """
+        Store scores of the metrics except target. When metric_scores is None(e.g. failed), nan is stored.
+        """
+        for name, sign in self.metrics.items():
+            if (metric_scores is None) or (not name in metric_scores):
+                scores = dict(cv_train_scores=[np.nan]*len(self.train_score_keys), cv_test_scores=[np.nan]*len(self.test_score_keys), 
+                              train_score=np.nan, validation_score=np.nan)
+            else:
+                scores = metric_scores[name]
+            cv_train_scores = sign*np.array(scores["cv_train_scores"], dtype=float)
+            cv_test_scores = sign*np.array(scores["cv_test_scores"], dtype=float)
+
+            self._store(self.score_summarizer_name+"_train_"+name, self.score_summarizer(cv_train_scores))
+            self._store("std_train_"+name, np.std(cv_train_scores))
+            self._store(self.score_summarizer_name+"_test_"+name, self.score_summarizer(cv_test_scores))
+            self._store("std_test_"+name, np.std(cv_test_scores))
+            self._store("train_"+name+"(whole)", sign*scores["train_score"])
+            self._store("validation_"+name, sign*scores["validation_score"])
+            for i in range(len(self.train_score_keys)):
+                self._store("split"+str(i)+"_train_"+name, cv_train_scores[i])
+            for i in range(len(self.test_score_keys)):
+                self._store("split"+str(i)+"_test_"+name, cv_test_scores[i])
+
+    def _store_cv_result(self, cv_train_scores, cv_test_scores, params, fit_times, score_times, 
+                         feature_select, X_shape, start_time,
+                         end_time, train_score, validation_score, cache_hit, pruned, budget, rung, timed_out, metric_scores):
         cv_train_scores, cv_test_scores, train_score, validation_score = self._init_score(cv_train_scores, cv_test_scores, train_score, validation_score)
 
         # Summary
-        self._store("index", len(self.cv_results_["index"]))
+        self._row = OrderedDict()
+        self._store("index", len(self._results))
         self._store("params", params)
         self._store("start_time", start_time)
         self._store("end_time", end_time)
@@ -121,6 +343,7 @@ class CVSummarizer:
             self._store(key, cv_train_scores[i])
         for i , key in enumerate (self.test_score_keys):
             self._store(key, cv_test_scores[i])
+        self._store_metric_scores(metric_scores)
 
         # Parameter details
         self._store("X_shape", X_shape)
@@ -138,29 +361,39 @@ class CVSummarizer:
             self._store("elapsed_time_sec", (end_time-start_time).seconds)
         else:
             self._store("elapsed_time_sec", np.nan)
+        self._store("cache_hit", cache_hit)
+        self._store("pruned", pruned)
+        self._store("timed_out", timed_out)
+        if (budget is not None) or ("budget" in self.cv_results_):
+            # Multi-fidelity search
+            self._store("budget", np.nan if budget is None else budget)
+            self._store("rung", np.nan if rung is None else rung)
 
         self._store("model_id", self.model_id)
+        self._results.append(self._row)
+        self._row = None
         self._save()
-        self._update_best()
+        self._update_best(len(self._results)-1)
+        self._update_runtime_model(len(self._results)-1)
+
+    def _update_runtime_model(self, index=None):
+        """
+        Add the trial(index) to runtime model. When index is None, all trials are added.
+        """
+        elapsed_times = self.cv_results_.get("elapsed_time_sec", [np.nan]*len(self.cv_results_["params"]))
+        indexes = range(len(self.cv_results_["params"])) if index is None else [index]
+        for i in indexes:
+            self._runtime_model.update(self.cv_results_["params"][i], float(elapsed_times[i]))
+
+    def estimate_time_sec(self, params):
+        """
+        Predict elapsed time(sec) of the trial of params(nan when it can not be predicted yet).
+        """
+        return self._runtime_model.predict(params)
 
     def _estimate_time_sec(self, params):
-        df = pd.DataFrame(self.cv_results_["params"]+[params])
-
-        strcols = df.columns[df.dtypes==object].tolist()
-        df[strcols] = df[strcols].fillna("none")
-        le = LabelEncoder()
-        for strcol in strcols:
-            df.loc[:, strcol] = le.fit_transform(df.loc[:, strcol].tolist())
-
-        Xtrain = df.iloc[:df.index.max()].dropna(axis=0, inplace=False)
-        Xtest = df.iloc[[df.index.max()]].dropna(axis=0, inplace=False)
-
-        if (len(Xtrain) ==0) or (len(Xtest)==0):
-            self.next_elapsed_time = np.nan
-        else:
-            estimator = RandomForestRegressor()
-            estimator.fit(Xtrain, self.cv_results_["elapsed_time_sec"])
-            self.next_elapsed_time = int(estimator.predict(Xtest))
+        elapsed_time = self.estimate_time_sec(params)
+        self.next_elapsed_time = np.nan if np.isnan(elapsed_time) else int(elapsed_time)
 
     def display_status(self, params, start_time=None):
         if self.verbose > 0:
@@ -182,7 +415,8 @@ class CVSummarizer:
             elif self.verbose == 2:
                 if self.nbv is None:
                     if n_search > 0:
-                        self.nbv = NoteBookVisualizer(cv_results_cols=self.cv_results_.keys(), sign=self.sign, valid=self.valid)
+                        self.nbv = NoteBookVisualizer(cv_results_cols=self.cv_results_.keys(), sign=self.sign, valid=self.valid, 
+                                                      train=self.train)
                 else:
                     self.nbv.fit(cv_results=self.cv_results_, estimeted_end_time=estimated_end_time)
             
@@ -191,6 +425,18 @@ class CVSummarizer:
 class NoteBookVisualizer():
     """
     Visualize cross validation results.
+
+    Only new results are processed in fit, and running aggregates(best scores, std band, 
+    fixed-bin histograms and category counts of params) are kept.
+    Figures are updated by a single push_notebook at most once per refresh_interval.
+
+    Class Variables
+    ---------------
+    refresh_interval: float, default=1.0.
+        Minimum interval(sec) of updating figures. Pending results are pushed when flush is called(end of fit).
+
+    n_bins: int, default=10.
+        Number of bins of numeric param's histogram. Bins are widened(and recounted) only when a value is out of range.
     """
     time_col = "end_time"
     score_cols = dict(train="mean_train_score", test="mean_test_score", valid="validation_score")
@@ -199,6 +445,8 @@ class NoteBookVisualizer():
     display_width = 950
     n_col_param = 5
     stream_rollover = 256
+    refresh_interval = 1.0
+    n_bins = 10
     headline = """
                <div style="font-family:segoe ui, sans-serif; font-style:italic; font-size:x-large; 
                border-bottom:solid 2.5px #7f7f7f; color:#1987E5; padding-bottom: 3px;">TEXT</div>
@@ -209,7 +457,6 @@ class NoteBookVisualizer():
         for key in cv_score_std.keys():
             patches[key] = [(slice(NoteBookVisualizer.stream_rollover*2), cv_score_std[key])]
         self.cv_score_std_src.patch(patches)
-        push_notebook(handle=self.bokeh_handle)
             
     def _update_param_srcs(self, param_dists):
         for key in param_dists.keys():
@@ -229,7 +476,6 @@ class NoteBookVisualizer():
 
             if len(new_data) > 0:
                 self.param_srcs[key].stream(new_data)
-            push_notebook(handle=self.bokeh_handle)
             
     def _mk_partial_dict(self, tgt_dict, tgt_keys):
         return dict(zip(tgt_keys, [tgt_dict[key] for key in tgt_keys]))
@@ -266,70 +512,134 @@ class NoteBookVisualizer():
         p.axis.major_label_text_font = "segoe ui"
         p.legend.click_policy="hide"
         return p
-    
-    def _init_cv_results(self, cv_results):
-        cv_results = pd.DataFrame(cv_results)
-        cv_results = cv_results[~cv_results[[NoteBookVisualizer.time_col, NoteBookVisualizer.score_cols["test"], NoteBookVisualizer.score_std_cols["test"]]].isnull().any(axis=1)]
 
-        cv_results.reset_index(drop=True, inplace=True)
-        if len(cv_results) == 0:
-            return None, None, None
+    def _is_missing(self, value):
+        return (value is None) or (isinstance(value, (numbers.Real, np.floating)) and np.isnan(value))
 
-        cv_results.rename(columns=dict([(col, col.split("param_")[-1]) for col in cv_results.columns if "param_" in col]), inplace=True)
+    def _add_param(self, param_col, value):
+        stat = self._param_stats.get(param_col)
+        if stat is None:
+            if self._is_missing(value):
+                # Kind of param is decided by the first value which is not missing.
+                self._n_missing[param_col] = self._n_missing.get(param_col, 0) + 1
+                return
+            # After figures are made, param which has no value is shown as bar graph.
+            if isinstance(value, (numbers.Real, np.floating)) and (not isinstance(value, (bool, np.bool_))) \
+                and (self.bokeh_handle is None):
+                stat = dict(values=[], edges=None, counts=None)
+            else:
+                stat = OrderedDict()
+                if param_col in self._n_missing:
+                    stat["none"] = self._n_missing.pop(param_col)
+            self._param_stats[param_col] = stat
+
+        if isinstance(stat, OrderedDict):
+            # Category counts(labels are kept in order of appearance).
+            label = "none" if self._is_missing(value) else value
+            try:
+                hash(label)
+            except TypeError:
+                label = str(label)
+            stat[label] = stat.get(label, 0) + 1
+        elif not (self._is_missing(value) or isinstance(value, str)):
+            value = float(value)
+            stat["values"].append(value)
+            edges = stat["edges"]
+            if (edges is None) or (value < edges[0]) or (edges[-1] < value):
+                lower, upper = min(stat["values"]), max(stat["values"])
+                if edges is not None:
+                    # Range is widened at least twice to recount rarely.
+                    width = edges[-1] - edges[0]
+                    lower = min(lower, edges[-1] - 2*width) if value < edges[0] else edges[0]
+                    upper = max(upper, edges[0] + 2*width) if edges[-1] < value else edges[-1]
+                stat["counts"], stat["edges"] = np.histogram(stat["values"], bins=NoteBookVisualizer.n_bins, range=(lower, upper) if lower < upper else None)
+            else:
+                i = min(np.searchsorted(edges, value, side="right")-1, NoteBookVisualizer.n_bins-1)
+                stat["counts"][i] += 1
+
+    def _add_results(self, cv_results):
+        """
+        Add the results which are not added yet(cv_results: dict of columns, e.g. CVSummarizer.cv_results_).
+        """
+        n_rows = len(cv_results[NoteBookVisualizer.time_col]) if NoteBookVisualizer.time_col in cv_results else 0
+        for i in range(self._n_added, n_rows):
+            row = {key:cv_results[key][i] for key in [NoteBookVisualizer.time_col, NoteBookVisualizer.score_cols["test"], NoteBookVisualizer.score_std_cols["test"]]}
+            if any([self._is_missing(row[key]) for key in row]):
+                continue
+            self._n_valid_rows += 1
+
+            point = {NoteBookVisualizer.time_col:row[NoteBookVisualizer.time_col]}
+            best = {NoteBookVisualizer.time_col:row[NoteBookVisualizer.time_col]}
+            for data_type in self.data_types:
+                score = float(cv_results[NoteBookVisualizer.score_cols[data_type]][i])
+                point[NoteBookVisualizer.score_cols[data_type]] = score
+                # Same as cummax(cummin), nan is kept.
+                if not np.isnan(score):
+                    if np.isnan(self._best[data_type]) or (self.sign*score > self.sign*self._best[data_type]):
+                        self._best[data_type] = score
+                best["best_"+data_type] = np.nan if np.isnan(score) else self._best[data_type]
+            for data_type in [i for i in ["train", "test"] if i in self.data_types]:
+                score = float(cv_results[NoteBookVisualizer.score_cols[data_type]][i])
+                std = float(cv_results[NoteBookVisualizer.score_std_cols[data_type]][i])
+                self._std_band[data_type].append((score+std, score-std))
+            self._std_band[NoteBookVisualizer.time_col].append(row[NoteBookVisualizer.time_col])
+
+            for param_col in self.all_param_cols:
+                value = cv_results["param_"+param_col][i]
+                point[param_col] = "none" if self._is_missing(value) else value
+                if param_col in self.param_feature_cols:
+                    self._feature_counts[param_col] += int(bool(value))
+                else:
+                    self._add_param(param_col, value)
+            for key, value in point.items():
+                self._pending_cv.setdefault(key, deque(maxlen=NoteBookVisualizer.stream_rollover)).append(value)
+            for key, value in best.items():
+                self._pending_best.setdefault(key, deque(maxlen=NoteBookVisualizer.stream_rollover)).append(value)
+        self._n_added = max(self._n_added, n_rows)
+
+    def _mk_cv_score_std(self):
+        times = list(self._std_band[NoteBookVisualizer.time_col])
+        cv_score_std = {NoteBookVisualizer.time_col:times+times[::-1]}
+        for data_type in [i for i in ["train", "test"] if i in self.data_types]:
+            band = list(self._std_band[data_type])
+            cv_score_std[self.score_cols[data_type]] = [i[0] for i in band] + [i[1] for i in band][::-1]
 
-        if self.sign == 1:
-            cv_results[["best_train", "best_test", "best_valid"]] = cv_results[[NoteBookVisualizer.score_cols["train"], NoteBookVisualizer.score_cols["test"], NoteBookVisualizer.score_cols["valid"]]].cummax()
-        else:
-            cv_results[["best_train", "best_test", "best_valid"]] = cv_results[[NoteBookVisualizer.score_cols["train"], NoteBookVisualizer.score_cols["test"], NoteBookVisualizer.score_cols["valid"]]].cummin()
-               
-        cv_score_std = {NoteBookVisualizer.time_col:cv_results[NoteBookVisualizer.time_col].tolist()+cv_results[NoteBookVisualizer.time_col].tolist()[::-1],}
-        for data_type in ["train", "test"]:
-            cv_score_std[self.score_cols[data_type]] = (cv_results[self.score_cols[data_type]]+cv_results[self.score_std_cols[data_type]]).tolist()
-            cv_score_std[self.score_cols[data_type]] += (cv_results[self.score_cols[data_type]]-cv_results[self.score_std_cols[data_type]]).iloc[::-1].tolist()
-        
         # to support stream_rollover
-        css_length = int(len(cv_score_std[NoteBookVisualizer.time_col])/2)
-        if css_length > NoteBookVisualizer.stream_rollover:
-            for key in cv_score_std.keys():
-                cv_score_std[key] = cv_score_std[key][css_length - NoteBookVisualizer.stream_rollover :css_length + NoteBookVisualizer.stream_rollover]
-        else:
-            for key in cv_score_std.keys():
-                cv_score_std[key].extend(["nan"]*((NoteBookVisualizer.stream_rollover - css_length)*2))
+        css_length = len(times)
+        for key in cv_score_std.keys():
+            cv_score_std[key].extend(["nan"]*((NoteBookVisualizer.stream_rollover - css_length)*2))
+        return cv_score_std
 
+    def _mk_param_dists(self):
         param_dists = dict()
         if len(self.param_feature_cols) > 1:
             param_dists[st.FEATURE_SELECT_PARAMNAME_PREFIX] = dict(label=[i.split(st.FEATURE_SELECT_PARAMNAME_PREFIX)[-1] for i in self.param_feature_cols], 
                                                                     x=[int(i.split(st.FEATURE_SELECT_PARAMNAME_PREFIX)[-1])-1 for i in self.param_feature_cols], 
-                                                                    top=cv_results[self.param_feature_cols].sum(0).values.tolist())
+                                                                    top=[self._feature_counts[i] for i in self.param_feature_cols])
         for param_col in self.param_cols:
-            if cv_results[param_col].dtypes == "object":
-                vc = cv_results[param_col].value_counts(dropna=False).sort_index()
-                obj_param_dist = dict(label=vc.index.fillna("none").tolist(), top=vc.values.tolist())
-                try:
-                    chk_dict = dict(zip(self.param_srcs["label"], self.param_srcs["x"]))
-                    for label in list(obj_param_dist["label"]):
-                        if not(label in self.param_srcs["label"]):
-                            chk_dict[label] = len(chk_dict[label]) - 1
-
-                    obj_param_dist["label"] = list(chk_dict.keys())
-                    obj_param_dist["x"] = list(chk_dict.values())                        
-                except (AttributeError, KeyError):
-                    obj_param_dist["x"] = [i for i in range(len(obj_param_dist["label"]))]
-                param_dists[param_col] = copy.deepcopy(obj_param_dist)
+            stat = self._param_stats.get(param_col)
+            if stat is None:
+                # All values are missing.
+                param_dists[param_col] = dict(label=["none"], x=[0], top=[self._n_missing.get(param_col, 0)])
+            elif isinstance(stat, OrderedDict):
+                param_dists[param_col] = dict(label=list(stat.keys()), x=[i for i in range(len(stat))], top=list(stat.values()))
             else:
-                hist, edges = np.histogram(cv_results[param_col], density=False, bins=10)
-                param_dists[param_col] = dict(left=list(edges[:-1]), right=list(edges[1:]), top=list(hist))
-                    
-        cv_results[self.param_cols] = cv_results[self.param_cols].fillna("none")
-        
-        return cv_results, cv_score_std, param_dists
+                edges = stat["edges"]
+                param_dists[param_col] = dict(left=list(edges[:-1]), right=list(edges[1:]), top=list(stat["counts"]))
+        return param_dists
+
+    def _pop_pending(self, pending):
+        data = dict([(key, list(values)) for key, values in pending.items()])
+        pending.clear()
+        return data
     
-    def __init__(self, cv_results_cols, sign, valid):
+    def __init__(self, cv_results_cols, sign, valid, train=True):
         self.sign = sign
+        self.data_types = ["test"]
+        if train and (NoteBookVisualizer.score_cols["train"] in cv_results_cols):
+            self.data_types = ["train"] + self.data_types
         if valid:
-            self.data_types = ["train", "test", "valid"]
-        else:
-            self.data_types = ["train", "test"]
+            self.data_types.append("valid")
 
         self.param_feature_cols = [i.split("param_")[-1] for i in cv_results_cols if("param_"+st.FEATURE_SELECT_PARAMNAME_PREFIX in i)&(i!="param_"+st.FEATURE_SELECT_PARAMNAME_PREFIX+str(st.ALWAYS_USED_FEATURE_GROUP_ID))]
         self.all_param_cols = [i.split("param_")[-1] for i in cv_results_cols if("param_" in i)&(i!="param_"+st.FEATURE_SELECT_PARAMNAME_PREFIX+str(st.ALWAYS_USED_FEATURE_GROUP_ID))]
@@ -337,20 +647,54 @@ class NoteBookVisualizer():
         self.param_cols.sort()
         
         self.bokeh_handle = None
+
+        # Running aggregates
+        self._n_added = 0
+        self._n_valid_rows = 0
+        self._best = dict([(i, np.nan) for i in self.data_types])
+        self._std_band = dict([(i, deque(maxlen=NoteBookVisualizer.stream_rollover)) for i in ["train", "test", NoteBookVisualizer.time_col]])
+        self._feature_counts = dict([(i, 0) for i in self.param_feature_cols])
+        self._param_stats = dict()
+        self._n_missing = dict()
+        # Points which are not streamed yet.
+        self._pending_cv = OrderedDict()
+        self._pending_best = OrderedDict()
+        self._estimeted_end_time = None
+        self._last_push = None
+
+    def flush(self, cv_results=None):
+        """
+        Update figures by pending results(and cv_results when it is given) and push to notebook.
+        """
+        if cv_results is not None:
+            self._add_results(cv_results)
+        if self.bokeh_handle is None:
+            return
+        self.end_time_src.patch({"text":[(0, "This search end time(estimated): "+str(self._estimeted_end_time))]})
+        if len(self._pending_cv) > 0:
+            self.cv_src.stream(self._pop_pending(self._pending_cv), rollover=NoteBookVisualizer.stream_rollover)
+            self.best_src.stream(self._pop_pending(self._pending_best), rollover=NoteBookVisualizer.stream_rollover)
+            self._update_cv_score_std_src(self._mk_cv_score_std())
+            self._update_param_srcs(self._mk_param_dists())
+        push_notebook(handle=self.bokeh_handle)
+        self._last_push = time.time()
         
     def fit(self, cv_results, estimeted_end_time):
-        cv_results, cv_score_std, param_dists = self._init_cv_results(cv_results)
+        self._add_results(cv_results)
+        self._estimeted_end_time = estimeted_end_time
 
         if self.bokeh_handle is None:
-            if cv_results is None:
+            if self._n_valid_rows == 0:
                 return
 
             # mk bokeh source
-            self.cv_src, cv_hover = self._mk_score_source(cv_results, xcol=NoteBookVisualizer.time_col, score_cols=[NoteBookVisualizer.score_cols[i] for i in self.data_types], 
+            cv_score_std = self._mk_cv_score_std()
+            param_dists = self._mk_param_dists()
+            self.cv_src, cv_hover = self._mk_score_source(self._pop_pending(self._pending_cv), xcol=NoteBookVisualizer.time_col, score_cols=[NoteBookVisualizer.score_cols[i] for i in self.data_types], 
                                                           hover_cols=self.all_param_cols)
-            self.end_time_src = ColumnDataSource(data=dict(text=["This search end time(estimated): "+estimeted_end_time]))
+            self.end_time_src = ColumnDataSource(data=dict(text=["This search end time(estimated): "+str(estimeted_end_time)]))
             self.cv_score_std_src = ColumnDataSource(data=cv_score_std)
-            self.best_src = self._mk_score_source(cv_results, xcol=NoteBookVisualizer.time_col, score_cols=["best_"+i for i in self.data_types])
+            self.best_src = self._mk_score_source(self._pop_pending(self._pending_best), xcol=NoteBookVisualizer.time_col, score_cols=["best_"+i for i in self.data_types])
             
             self.param_srcs = dict()
             for key in param_dists.keys():
@@ -454,16 +798,8 @@ class NoteBookVisualizer():
                                [list(param_vbar_ps.values())[i:i+NoteBookVisualizer.n_col_param] for i in range(0, len(param_vbar_ps), NoteBookVisualizer.n_col_param)]+\
                                [list(param_hist_ps.values())[i:i+NoteBookVisualizer.n_col_param] for i in range(0, len(param_hist_ps), NoteBookVisualizer.n_col_param)])
             self.bokeh_handle = show(p, notebook_handle=True)
-        else:
-            # update bokeh src
-            self.end_time_src.patch({"text":[(0, "This search end time(estimated): "+estimeted_end_time)]})
-            if len(cv_results) != len(self.cv_src.data[NoteBookVisualizer.time_col]):
-                self.cv_src.stream(cv_results[list(self.cv_src.data.keys())].iloc[-1:].to_dict(orient="list"), 
-                                   rollover=NoteBookVisualizer.stream_rollover)
-                self.best_src.stream(cv_results[list(self.best_src.data.keys())].iloc[-1:].to_dict(orient="list"), 
-                                     rollover=NoteBookVisualizer.stream_rollover)
-                push_notebook(handle=self.bokeh_handle)
-
-                self._update_cv_score_std_src(cv_score_std)
-                self._update_param_srcs(param_dists)
+            self._last_push = time.time()
+        elif time.time() - self._last_push >= NoteBookVisualizer.refresh_interval:
+            # Updates are coalesced into one push per refresh_interval.
+            self.flush()
 
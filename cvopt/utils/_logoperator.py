@@ -1,8 +1,10 @@
 import os, warnings
 import pandas as pd, numpy as np
 from sklearn.externals import joblib
+from sklearn.externals.joblib import Parallel, delayed
 
-from ._base import chk_Xy
+from ._base import chk_Xy, mk_dir
+from ._logstore import LogStore
 from ..model_selection import _setting as st
 
 
@@ -29,6 +31,11 @@ def extract_params(logdir, model_id, target_index, feature_groups=None):
         feature select flag is bool vector. 
         If this value is True, optimizer recommend using corresponding column.
     
+    Notes
+    -----
+    When the log store({logdir}/cv_results/{model_id}.store, see log_format option of optimizer) exists, 
+    it is used instead of csv and only the target row is read.
+
     Returns
     -------  
     estimator_params: dict
@@ -41,12 +48,23 @@ def extract_params(logdir, model_id, target_index, feature_groups=None):
         feature select flag of the target model.
     
     """
-    logfile = pd.read_csv(os.path.join(logdir, "cv_results", model_id+".csv"))
-    logfile.set_index("index", inplace=True)
-    if not logfile.index.is_unique:
-        raise Exception("%s index must be unique" %os.path.join(logdir, "cv_results", model_id+".csv"))
+    store_path = os.path.join(logdir, "cv_results", model_id+".store")
+    if LogStore.exists(store_path):
+        # Only index column is scanned and the target row is read directly.
+        store = LogStore(store_path)
+        positions = np.where(store.column("index") == target_index)[0]
+        if len(positions) > 1:
+            raise Exception("%s index must be unique" %store_path)
+        if len(positions) == 0:
+            raise KeyError(target_index)
+        params = store.read(int(positions[0]))["params"]
+    else:
+        logfile = pd.read_csv(os.path.join(logdir, "cv_results", model_id+".csv"))
+        logfile.set_index("index", inplace=True)
+        if not logfile.index.is_unique:
+            raise Exception("%s index must be unique" %os.path.join(logdir, "cv_results", model_id+".csv"))
 
-    params = eval(logfile.loc[target_index, "params"])
+        params = eval(logfile.loc[target_index, "params"])
     estimator_params = dict()
     feature_params = dict()
     feature_select_flag = np.array(feature_groups).astype(str)
@@ -110,6 +128,12 @@ def mk_metafeature(X, y, logdir, model_id, target_index, cv,
     
     merge: bool, default=True.
         if True, return matrix which result per cv is merged into.
+
+    Notes
+    -----
+    When out-of-fold predictions were saved in optimizer training(save_oof), 
+    they are used and estimators are not loaded(cv is not used). 
+    Otherwise estimators saved in optimizer training(save_estimator) are used.
     
     Returns
     -------
@@ -135,6 +159,23 @@ def mk_metafeature(X, y, logdir, model_id, target_index, cv,
     X_ind = []
     estdir = os.path.join(logdir, "estimators", model_id)
     name_prefix = model_id + "_index" + "{0:05d}".format(target_index)
+
+    oofdir = os.path.join(logdir, "oof", model_id)
+    if os.path.isfile(os.path.join(oofdir, name_prefix+"_oof_"+estimator_method+".npy")):
+        folds = np.load(os.path.join(oofdir, model_id+"_folds.npz"))
+        oof = np.load(os.path.join(oofdir, name_prefix+"_oof_"+estimator_method+".npy"))
+        if merge:
+            X_meta = oof[np.argsort(folds["test_index"])]
+        else:
+            X_meta = np.split(oof, np.cumsum(folds["fold_sizes"])[:-1])
+
+        if validation_data is None:
+            return X_meta
+        elif os.path.isfile(os.path.join(oofdir, name_prefix+"_valid_"+estimator_method+".npy")):
+            return X_meta, np.load(os.path.join(oofdir, name_prefix+"_valid_"+estimator_method+".npy"))
+        else:
+            estimator = joblib.load(os.path.join(estdir, name_prefix+"_test.pkl"))
+            return X_meta, getattr(estimator, estimator_method)(Xvalid)
     
     #estimator = joblib.load(os.path.join(estdir, name_prefix+"_split"+"{0:02d}".format(0)+".pkl"))
     #cv = check_cv(cv, y, classifier=is_classifier(estimator))
@@ -154,3 +195,175 @@ def mk_metafeature(X, y, logdir, model_id, target_index, cv,
     else:
         estimator = joblib.load(os.path.join(estdir, name_prefix+"_test.pkl"))
         return X_meta, getattr(estimator, estimator_method)(Xvalid)
+
+
+def _fill_by_estimator(out, cols, rows, X, feature_select_flag, estimator_path, estimator_method, chunk_size):
+    """
+    Predict X[rows] by the saved estimator chunk by chunk and write predictions to out[rows, cols].
+    """
+    estimator = joblib.load(estimator_path)
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start+chunk_size]
+        Xchunk = X[chunk]
+        if feature_select_flag is not None:
+            Xchunk = Xchunk[:, feature_select_flag]
+        out[chunk, cols] = np.asarray(getattr(estimator, estimator_method)(Xchunk)).reshape(len(chunk), -1)
+
+
+def _fill_by_prediction(out, cols, rows, prediction_path, chunk_size):
+    """
+    Write saved predictions(out-of-fold or validation) to out[rows, cols] chunk by chunk.
+    """
+    prediction = np.load(prediction_path, mmap_mode="r")
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start+chunk_size]
+        out[chunk, cols] = np.asarray(prediction[start:start+chunk_size]).reshape(len(chunk), -1)
+
+
+def mk_metafeatures(X, y, logdir, targets, cv, 
+                    validation_data=None, feature_groups=None, estimator_method="predict", 
+                    n_jobs=1, chunk_size=10000, memmap_dir=None):
+    """
+    Make meta features of multiple models at once(batch version of mk_metafeature).
+
+    Estimators are loaded and predict in parallel, and predictions are written 
+    directly into the preallocated output matrix at cv test indices.
+    
+    Parameters
+    ----------
+    X :np.ndarray or pd.core.frame.DataFrame, shape(axis=0) = (n_samples)
+        Features that was used in optimizer training. Detail depends on estimator.
+        
+    y: np.ndarray or pd.core.frame.DataFrame, shape(axis=0) = (n_samples) or None, default=None.
+        Target variable that was used in optimizer training. Detail depends on estimator.
+        
+    logdir: str.
+        cvopt's log directory path.
+    
+    targets: list of tuple(model_id, target_index).
+        Targets to make meta feature. 
+        All targets must be trained using same X, y and cv(feature_groups may be different per model_id).
+
+    cv: scikit-learn cross-validator
+        Cross validation setting that was used in optimizer training.
+        
+    validation_data: tuple(X, y) or None, default=None.
+        Detail depends on estimator.
+        Meta feature correspond to validation_data is made using the estimator 
+        which is fitted whole train data.
+        
+    feature_groups: array-like, shape = (n_samples,), dict or None, default=None.
+        cvopt feature_groups that was used in optimizer training.
+        When feature_groups is different per model_id, dict(key: model_id, value: feature_groups).
+        
+    estimator_method: str, default="predict".
+        Using estimator's method to make meta feature. Its return must be numeric.
+
+    n_jobs: int, default=1.
+        Number of jobs to run in parallel(task: a cv fold of a target).
+
+    chunk_size: int, default=10000.
+        Number of samples which are predicted at once. 
+        Smaller value keeps memory usage lower on large X.
+
+    memmap_dir: str or None, default=None.
+        When memmap_dir is not None, outputs are made as memory-mapped numpy file
+        ({memmap_dir}/X_meta.npy and {memmap_dir}/X_meta_validation.npy) and workers are run in processes.
+        When None, outputs are in memory and workers are run in threads.
+    
+    Returns
+    -------
+    X_meta or X_meta, X_meta_validation_data: np.ndarray or tuple of np.ndarray.
+        shape = (n_samples, n_columns). Columns of each target are arranged in the order of targets
+        (a target has multiple columns when estimator_method returns 2d array, e.g. predict_proba).
+        Rows which are not included in any cv test fold are nan.
+        When validation_data is input, return tuple.
+
+    Notes
+    -----
+    Out-of-fold predictions saved in optimizer training(save_oof) are used when they exist.
+    """
+    X = chk_Xy(X, none_error=True, ravel_1d=False, msg_sjt="X")
+    y = chk_Xy(y, none_error=False, ravel_1d=True, msg_sjt="y")
+    if validation_data is not None:
+        Xvalid = chk_Xy(validation_data[0], none_error=False, ravel_1d=False, msg_sjt="Xvalid")
+    test_indices = [test_index for _, test_index in cv.split(X, y)]
+
+    # Make tasks and decide the columns of each target.
+    tasks = []
+    valid_tasks = []
+    n_cols = 0
+    for model_id, target_index in targets:
+        model_id = str(model_id)
+        if isinstance(feature_groups, dict):
+            fg = feature_groups.get(model_id)
+        else:
+            fg = feature_groups
+        if fg is None:
+            feature_select_flag = None
+        else:
+            _, _, feature_select_flag = extract_params(logdir=logdir, model_id=model_id, 
+                                                       target_index=target_index, feature_groups=fg)
+
+        estdir = os.path.join(logdir, "estimators", model_id)
+        oofdir = os.path.join(logdir, "oof", model_id)
+        name_prefix = model_id + "_index" + "{0:05d}".format(target_index)
+        oof_path = os.path.join(oofdir, name_prefix+"_oof_"+estimator_method+".npy")
+        valid_path = os.path.join(oofdir, name_prefix+"_valid_"+estimator_method+".npy")
+
+        if os.path.isfile(oof_path):
+            shape = np.load(oof_path, mmap_mode="r").shape
+            width = int(np.prod(shape[1:]))
+            rows = np.load(os.path.join(oofdir, model_id+"_folds.npz"))["test_index"]
+            cols = slice(n_cols, n_cols+width)
+            tasks.append((_fill_by_prediction, dict(cols=cols, rows=rows, prediction_path=oof_path)))
+        else:
+            # The number of columns is decided by the prediction of one sample.
+            estimator = joblib.load(os.path.join(estdir, name_prefix+"_split00.pkl"))
+            Xsample = X[test_indices[0][:1]]
+            if feature_select_flag is not None:
+                Xsample = Xsample[:, feature_select_flag]
+            width = int(np.asarray(getattr(estimator, estimator_method)(Xsample)).reshape(1, -1).shape[1])
+            cols = slice(n_cols, n_cols+width)
+            for i, test_index in enumerate(test_indices):
+                tasks.append((_fill_by_estimator, dict(cols=cols, rows=test_index, X=X, feature_select_flag=feature_select_flag, 
+                                                       estimator_path=os.path.join(estdir, name_prefix+"_split"+"{0:02d}".format(i)+".pkl"), 
+                                                       estimator_method=estimator_method)))
+
+        if validation_data is not None:
+            rows = np.arange(Xvalid.shape[0])
+            if os.path.isfile(valid_path):
+                valid_tasks.append((_fill_by_prediction, dict(cols=cols, rows=rows, prediction_path=valid_path)))
+            else:
+                valid_tasks.append((_fill_by_estimator, dict(cols=cols, rows=rows, X=Xvalid, feature_select_flag=feature_select_flag, 
+                                                             estimator_path=os.path.join(estdir, name_prefix+"_test.pkl"), 
+                                                             estimator_method=estimator_method)))
+        n_cols += width
+
+    # Preallocate outputs.
+    def allocate(name, n_rows):
+        if memmap_dir is None:
+            out = np.empty((n_rows, n_cols))
+        else:
+            mk_dir(memmap_dir, error_level=0)
+            out = np.lib.format.open_memmap(os.path.join(memmap_dir, name+".npy"), mode="w+", dtype=float, shape=(n_rows, n_cols))
+        out[:] = np.nan
+        return out
+
+    X_meta = allocate("X_meta", X.shape[0])
+    if validation_data is not None:
+        X_meta_valid = allocate("X_meta_validation", Xvalid.shape[0])
+
+    parallel = Parallel(n_jobs=n_jobs, backend="threading" if memmap_dir is None else None)
+    parallel([delayed(func)(out=X_meta, chunk_size=chunk_size, **kwargs) for func, kwargs in tasks] 
+             + [delayed(func)(out=X_meta_valid, chunk_size=chunk_size, **kwargs) for func, kwargs in valid_tasks])
+
+    if memmap_dir is not None:
+        X_meta.flush()
+        if validation_data is not None:
+            X_meta_valid.flush()
+
+    if validation_data is None:
+        return X_meta
+    else:
+        return X_meta, X_meta_valid
@@ -0,0 +1,215 @@
+import os, json, numbers
+import numpy as np
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+# datetime.fromisoformat is not available before Python 3.7.
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _encode(value):
+    """
+    Convert value to JSON serializable object(type is kept by tag).
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+
+    if (value is None) or isinstance(value, (bool, int, float, str)):
+        return value
+    elif isinstance(value, tuple):
+        return {"__tuple__":[_encode(i) for i in value]}
+    elif isinstance(value, list):
+        return [_encode(i) for i in value]
+    elif isinstance(value, dict):
+        return {"__dict__":[[_encode(k), _encode(v)] for k, v in value.items()]}
+    elif isinstance(value, datetime):
+        return {"__datetime__":value.strftime(DATETIME_FORMAT)}
+    else:
+        return {"__repr__":repr(value)}
+
+
+def _decode(value):
+    namespace = {"np":np, "nan":np.nan, "inf":np.inf}
+    if isinstance(value, list):
+        return [_decode(i) for i in value]
+    elif isinstance(value, dict):
+        if "__tuple__" in value:
+            return tuple(_decode(i) for i in value["__tuple__"])
+        elif "__dict__" in value:
+            return {_decode(k):_decode(v) for k, v in value["__dict__"]}
+        elif "__datetime__" in value:
+            try:
+                return datetime.strptime(value["__datetime__"], DATETIME_FORMAT)
+            except ValueError:
+                # isoformat without microseconds.
+                return datetime.strptime(value["__datetime__"], "%Y-%m-%dT%H:%M:%S")
+        elif "__repr__" in value:
+            try:
+                return eval(value["__repr__"], namespace)
+            except Exception:
+                return value["__repr__"]
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (numbers.Number, np.number, np.bool_)) and (not isinstance(value, complex))
+
+
+
+class LogStore:
+    """
+    Indexed log store of cv results.
+
+    A row is appended to the following files in the directory.
+
+    * `records.jsonl`: A row per line as JSON(all columns including params).
+
+    * `records.idx`: Start offsets(int64) of the lines of records.jsonl. A row is read in O(1) by its position.
+
+    * `{column}.f8`: Values(float64) of a numeric column. A column is scanned without parsing records.
+
+    records.idx is written at last, so the row which is broken by crash is ignored and overwritten.
+
+    Parameters
+    ----------
+    path: str
+        Directory of the store.
+    """
+    record_name = "records.jsonl"
+    index_name = "records.idx"
+    column_suffix = ".f8"
+
+    def __init__(self, path):
+        self.path = path
+        self._n_rows = None
+        # Numeric columns(set) which is known by the writer. None means the store is not repaired yet.
+        self._columns = None
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.isfile(os.path.join(path, cls.index_name))
+
+    def _column_path(self, name):
+        return os.path.join(self.path, quote(str(name), safe="()_-.")+LogStore.column_suffix)
+
+    def _offset(self, position):
+        with open(os.path.join(self.path, LogStore.index_name), "rb") as f:
+            f.seek(8*position)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+
+    def __len__(self):
+        if self._n_rows is None:
+            if LogStore.exists(self.path):
+                self._n_rows = int(os.path.getsize(os.path.join(self.path, LogStore.index_name)) // 8)
+            else:
+                self._n_rows = 0
+        return self._n_rows
+
+    def _repair(self):
+        """
+        Remove the data which is written after the last complete row(e.g. the process was killed while writing).
+        """
+        n_rows = len(self)
+        record_path = os.path.join(self.path, LogStore.record_name)
+        index_path = os.path.join(self.path, LogStore.index_name)
+        if os.path.isfile(index_path) and (os.path.getsize(index_path) != 8*n_rows):
+            with open(index_path, "ab") as f:
+                f.truncate(8*n_rows)
+        if os.path.isfile(record_path):
+            if n_rows == 0:
+                end = 0
+            else:
+                with open(record_path, "rb") as f:
+                    f.seek(self._offset(n_rows-1))
+                    f.readline()
+                    end = f.tell()
+            if os.path.getsize(record_path) != end:
+                with open(record_path, "ab") as f:
+                    f.truncate(end)
+        for name in self.columns():
+            column_path = self._column_path(name)
+            size = os.path.getsize(column_path)
+            if size > 8*n_rows:
+                with open(column_path, "ab") as f:
+                    f.truncate(8*n_rows)
+            elif size < 8*n_rows:
+                with open(column_path, "ab") as f:
+                    np.full(n_rows-size//8, np.nan).tofile(f)
+        self._columns = set(self.columns())
+
+    def append(self, row):
+        """
+        Append a row(dict, key:column name).
+        """
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        if self._columns is None:
+            self._repair()
+        n_rows = len(self)
+
+        record_path = os.path.join(self.path, LogStore.record_name)
+        offset = os.path.getsize(record_path) if os.path.isfile(record_path) else 0
+        with open(record_path, "ab") as f:
+            f.write((json.dumps({str(k):_encode(v) for k, v in row.items()})+"\n").encode("utf-8"))
+
+        existing_columns = set(self._columns)
+        for key, value in row.items():
+            if key == "params":
+                continue
+            if _is_number(value):
+                value = float(value)
+            elif key in existing_columns:
+                value = np.nan
+            else:
+                continue
+            with open(self._column_path(key), "ab") as f:
+                if not key in existing_columns:
+                    # Column which appears in the middle of log.
+                    np.full(n_rows, np.nan).tofile(f)
+                    self._columns.add(key)
+                np.array([value], dtype=np.float64).tofile(f)
+        for key in existing_columns - set(row.keys()):
+            with open(self._column_path(key), "ab") as f:
+                np.array([np.nan], dtype=np.float64).tofile(f)
+
+        with open(os.path.join(self.path, LogStore.index_name), "ab") as f:
+            np.array([offset], dtype=np.int64).tofile(f)
+        self._n_rows = n_rows + 1
+
+    def read(self, position):
+        """
+        Read a row(dict) by position(start:0) in O(1).
+        """
+        n_rows = len(self)
+        if not (-n_rows <= position < n_rows):
+            raise IndexError("position %s is out of range(%s rows)." %(position, n_rows))
+        offset = self._offset(position % n_rows)
+        with open(os.path.join(self.path, LogStore.record_name), "rb") as f:
+            f.seek(offset)
+            record = json.loads(f.readline().decode("utf-8"))
+        return {k:_decode(v) for k, v in record.items()}
+
+    def __iter__(self):
+        n_rows = len(self)
+        with open(os.path.join(self.path, LogStore.record_name), "rb") as f:
+            for _ in range(n_rows):
+                record = json.loads(f.readline().decode("utf-8"))
+                yield {k:_decode(v) for k, v in record.items()}
+
+    def columns(self):
+        """
+        Names of numeric columns.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return [unquote(i[:-len(LogStore.column_suffix)]) for i in sorted(os.listdir(self.path))
+                if i.endswith(LogStore.column_suffix)]
+
+    def column(self, name):
+        """
+        Values(numpy.array, float64) of a numeric column. Rows which is not number are nan.
+        """
+        values = np.fromfile(self._column_path(name), dtype=np.float64)[:len(self)]
+        if len(values) < len(self):
+            values = np.concatenate([values, np.full(len(self)-len(values), np.nan)])
+        return values
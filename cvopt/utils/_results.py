@@ -0,0 +1,141 @@
+import numbers
+import numpy as np, pandas as pd
+from collections import OrderedDict
+
+
+def _kind(value):
+    """
+    Kind of column which can hold value.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    elif isinstance(value, (numbers.Integral, np.integer)):
+        return "int"
+    elif isinstance(value, (numbers.Real, np.floating)):
+        return "float"
+    else:
+        return "object"
+
+
+# Kind of column which can hold values of both kinds.
+_PROMOTE = {("int", "float"):"float", ("float", "int"):"float"}
+_DTYPES = {"bool":bool, "int":np.int64, "float":np.float64}
+
+
+class ResultColumns:
+    """
+    Columnar storage of cv results.
+
+    Numeric(bool, int, float) columns are stored in preallocated numpy buffers whose capacity is doubled when full
+    (amortized O(1) append), and the other columns are stored in list.
+    When a value can not be held by the column's dtype, the column is converted(int -> float, otherwise -> list).
+
+    results(OrderedDict) is the dict interface of stored rows(value: numpy view of buffer or list),
+    which is used as cv_results_. It is kept as the same object and its values are updated when rows are appended.
+
+    Parameters
+    ----------
+    columns: list of str
+        Columns which exist before the first row is appended.
+    """
+    initial_capacity = 64
+
+    def __init__(self, columns=()):
+        self.results = OrderedDict([(key, []) for key in columns])
+        self._buffers = OrderedDict([(key, []) for key in columns])
+        self._n_rows = 0
+        self._frame = None
+
+    def __len__(self):
+        return self._n_rows
+
+    def _mk_buffer(self, kind, values, capacity):
+        if kind == "object":
+            return list(values)
+        buffer = np.empty(capacity, dtype=_DTYPES[kind])
+        buffer[:len(values)] = values
+        return buffer
+
+    def _column_kind(self, key):
+        buffer = self._buffers[key]
+        if isinstance(buffer, list):
+            return "object" if len(buffer) > 0 else None
+        return {np.dtype(bool):"bool", np.dtype(np.int64):"int", np.dtype(np.float64):"float"}[buffer.dtype]
+
+    def _set(self, key, position, value):
+        """
+        Set value to buffer of key at position(position <= the number of stored values).
+        """
+        buffer = self._buffers.get(key)
+        kind = _kind(value)
+        if buffer is None:
+            # Column which appears in the middle. Previous rows are nan.
+            if position > 0:
+                kind = "float" if kind in ["int", "float"] else "object"
+            buffer = self._mk_buffer(kind, [np.nan]*position, max(ResultColumns.initial_capacity, position+1))
+        else:
+            column_kind = self._column_kind(key)
+            if column_kind is None:
+                buffer = self._mk_buffer(kind, [], ResultColumns.initial_capacity)
+            elif column_kind != kind:
+                new_kind = _PROMOTE.get((column_kind, kind), "object")
+                if new_kind != column_kind:
+                    values = buffer if isinstance(buffer, list) else buffer[:position].tolist()
+                    buffer = self._mk_buffer(new_kind, values, len(buffer))
+
+        if isinstance(buffer, list):
+            buffer.append(value)
+        else:
+            if position >= len(buffer):
+                new_buffer = np.empty(2*len(buffer), dtype=buffer.dtype)
+                new_buffer[:position] = buffer[:position]
+                buffer = new_buffer
+            buffer[position] = value
+        self._buffers[key] = buffer
+
+    def _refresh(self, key):
+        buffer = self._buffers[key]
+        if isinstance(buffer, list):
+            if not self.results.get(key) is buffer:
+                self.results[key] = buffer
+        else:
+            self.results[key] = buffer[:self._n_rows]
+
+    def append(self, row):
+        """
+        Append a row(dict, key:column name). Columns which is not in row are nan.
+        """
+        position = self._n_rows
+        for key, value in row.items():
+            self._set(key, position, value)
+        for key in [key for key in self._buffers if not key in row]:
+            self._set(key, position, np.nan)
+        self._n_rows += 1
+        for key in self._buffers:
+            self._refresh(key)
+        self._frame = None
+
+    def set_column(self, key, values):
+        """
+        Set values of whole column(used when results are loaded from log file).
+        """
+        values = list(values)
+        kinds = set([_kind(value) for value in values])
+        if len(kinds) == 1:
+            kind = kinds.pop()
+        elif kinds == set(["int", "float"]):
+            kind = "float"
+        else:
+            kind = "object"
+        self._buffers[key] = self._mk_buffer(kind, values, max(ResultColumns.initial_capacity, 2*len(values)))
+        self._n_rows = len(values)
+        self._refresh(key)
+        self._frame = None
+
+    def to_frame(self):
+        """
+        pandas.DataFrame of stored rows. It is cached until the next row is appended.
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.results)
+        return self._frame
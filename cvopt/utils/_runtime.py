@@ -0,0 +1,108 @@
+import numbers
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+
+
+class RuntimeModel:
+    """
+    Predict elapsed time(sec) of a trial from its params.
+
+    Observations are added incrementally by update, and estimator is refitted on a geometric schedule
+    (when the number of observations reaches refit_growth times of the last fit), so the total cost of fitting is
+    O(n log n) over n trials. predict uses the last fitted estimator.
+
+    Params are encoded by cached encoders: number -> float, other value(str, bool, None, ...) -> category code
+    (codes are assigned in order of appearance), missing -> -1.
+
+    Parameters
+    ----------
+    estimator: sklearn regressor or None, default=None.
+        When None, RandomForestRegressor(n_estimators=30) is used.
+
+    min_samples: int, default=2.
+        Minimum number of observations to fit estimator. Until fitted, predict returns nan.
+
+    refit_growth: float, default=1.5.
+        Estimator is refitted when the number of observations >= refit_growth * (number at the last fit).
+        When 1, estimator is refitted whenever observations are added.
+    """
+    def __init__(self, estimator=None, min_samples=2, refit_growth=1.5):
+        if refit_growth < 1:
+            raise Exception("`refit_growth` must be >= 1.")
+        self.estimator = estimator
+        self.min_samples = min_samples
+        self.refit_growth = refit_growth
+        # key: param name, value: index of feature.
+        self._keys = {}
+        self._categories = {}
+        self._rows = []
+        self._elapsed = []
+        self._fitted = None
+        self._n_fitted = 0
+        self._n_features = 0
+
+    def _encode_value(self, key, value):
+        if isinstance(value, (numbers.Real, np.floating)) and (not isinstance(value, (bool, np.bool_))):
+            return -1. if np.isnan(value) else float(value)
+        categories = self._categories.setdefault(key, {})
+        try:
+            hash(value)
+        except TypeError:
+            value = str(value)
+        if not value in categories:
+            categories[value] = float(len(categories))
+        return categories[value]
+
+    def _encode(self, params):
+        """
+        Encode params to dict(key: index of feature, value: float).
+        """
+        row = {}
+        for key, value in params.items():
+            if not key in self._keys:
+                self._keys[key] = len(self._keys)
+            row[self._keys[key]] = self._encode_value(key, value)
+        return row
+
+    def _to_array(self, rows):
+        X = np.full((len(rows), len(self._keys)), -1.)
+        for i, row in enumerate(rows):
+            for j, value in row.items():
+                X[i, j] = value
+        return X
+
+    def update(self, params, elapsed_time):
+        """
+        Add an observation. When elapsed_time is nan(e.g. failed), it is ignored.
+        """
+        if (elapsed_time is None) or np.isnan(elapsed_time):
+            return
+        self._rows.append(self._encode(params))
+        self._elapsed.append(float(elapsed_time))
+
+    def _fit(self):
+        n_rows = len(self._rows)
+        if (n_rows < self.min_samples) or (n_rows == self._n_fitted):
+            return
+        if (self._fitted is not None) and (n_rows < self.refit_growth*self._n_fitted):
+            return
+        if self.estimator is None:
+            estimator = RandomForestRegressor(n_estimators=30)
+        else:
+            estimator = clone(self.estimator)
+        X = self._to_array(self._rows)
+        self._fitted = estimator.fit(X, np.array(self._elapsed))
+        self._n_fitted, self._n_features = n_rows, X.shape[1]
+
+    def predict(self, params):
+        """
+        Predict elapsed time(sec) of params. When the estimator can not be fitted yet, returns nan.
+        """
+        self._fit()
+        if self._fitted is None:
+            return np.nan
+        # Keys which are unknown to the fitted estimator are ignored.
+        X = self._to_array([{self._keys[key]:self._encode_value(key, value)
+                             for key, value in params.items() if key in self._keys}])
+        return float(self._fitted.predict(X[:, :self._n_features])[0])
@@ -0,0 +1,222 @@
+import os, csv, time, numbers, threading, queue
+import numpy as np
+from sklearn.externals.joblib import dump
+
+
+def dump_file(obj, path, compress=0):
+    """
+    Save obj to path. When path's extension is .npy, obj is saved by numpy.save, otherwise joblib.dump.
+    """
+    if path.endswith(".npy"):
+        np.save(path, obj)
+    else:
+        dump(obj, path, compress=compress)
+
+
+class AsyncWriter:
+    """
+    Dump objects to files in a background thread.
+
+    Parameters
+    ----------
+    compress: int(0-9) or bool, default=0.
+        joblib.dump's compress level.
+
+    max_queue: int, default=8.
+        Max number of objects waiting to be dumped.
+        When the queue is full, dump waits until a slot is free(memory usage is bounded).
+    """
+    def __init__(self, compress=0, max_queue=8):
+        self.compress = compress
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    obj, path = item
+                    dump_file(obj, path, compress=self.compress)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def dump(self, obj, path):
+        """
+        Put obj into the queue. obj must not be modified until it is dumped(see flush).
+        """
+        self._raise()
+        self._queue.put((obj, path))
+
+    def flush(self):
+        """
+        Wait until all objects in the queue are dumped.
+        """
+        self._queue.join()
+        self._raise()
+
+    def close(self):
+        """
+        Flush and stop the background thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+
+
+def _to_cell(value):
+    """
+    Convert value to csv cell in the same way as pandas.DataFrame.to_csv(nan and None are empty).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (numbers.Real, np.floating)) and (not isinstance(value, (bool, np.bool_))) and np.isnan(value):
+        return ""
+    return str(value)
+
+
+class CSVWriter:
+    """
+    Append rows to csv file incrementally.
+
+    File is kept open and only the new row is serialized, so the cost per row does not depend on the number of rows.
+    A row is flushed at once when flush_interval passed since the last flush(rows are infrequent). 
+    Otherwise rows are buffered and flushed by a background timer within flush_interval, 
+    so buffered rows reach the file even if no row follows(e.g. the next trial is long or the process is killed).
+    fsync is run when fsync_interval passed and by the background timer(rows are not lost even if OS crashes).
+
+    Parameters
+    ----------
+    path: str
+        Path of csv file. When the file is empty or does not exist, header is written at first.
+        When the file exists, rows are appended along its header.
+
+    encoding: str, default="cp932".
+
+    flush_interval: float, default=1.0.
+        Interval(sec) of flush. When 0, every row is flushed.
+
+    fsync_interval: float, default=10.0.
+        Interval(sec) of fsync. When 0, fsync is run with every flush.
+    """
+    def __init__(self, path, encoding="cp932", flush_interval=1.0, fsync_interval=10.0):
+        self.path = path
+        self.encoding = encoding
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._writer = None
+        self._last_flush = None
+        self._last_fsync = None
+        self._timer = None
+        self._header = None
+        self._lock = threading.Lock()
+
+    def write(self, row, header):
+        """
+        Write a row(list of values) whose column names are header(list). 
+
+        When the header of the file is different from header(e.g. search is resumed from an older log), 
+        the file is rewritten once with the merged header(columns of the file, then the new columns) 
+        and the values of missing columns are empty, so that rows are not misaligned.
+        """
+        with self._lock:
+            if self._file is None:
+                self._open(header)
+            elif [i for i in header if i not in self._header]:
+                self._rewrite(header)
+            values = dict(zip(header, row))
+            self._writer.writerow([_to_cell(values.get(key)) for key in self._header])
+
+            now = time.time()
+            if now - self._last_flush >= self.flush_interval:
+                self._flush(fsync=(now - self._last_fsync >= self.fsync_interval))
+            elif self._timer is None:
+                # Buffered rows are flushed in background.
+                self._timer = threading.Timer(self.flush_interval - (now - self._last_flush), self._flush_pending)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _open(self, header):
+        if os.path.isfile(self.path) and (os.path.getsize(self.path) > 0):
+            with open(self.path, "r", encoding=self.encoding, newline="") as f:
+                file_header = next(csv.reader(f))
+        else:
+            file_header = None
+        self._file = open(self.path, "a", encoding=self.encoding, newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        # The first row is flushed at once.
+        self._last_flush = self._last_fsync = time.time() - self.flush_interval
+        if file_header is None:
+            self._header = list(header)
+            self._writer.writerow(self._header)
+        else:
+            self._header = file_header
+            if [i for i in header if i not in self._header]:
+                self._rewrite(header)
+
+    def _rewrite(self, header):
+        """
+        Rewrite the file with the header merged with header.
+        """
+        self._file.close()
+        merged = self._header + [i for i in header if i not in self._header]
+        tmp_path = self.path + ".tmp"
+        with open(self.path, "r", encoding=self.encoding, newline="") as src, \
+             open(tmp_path, "w", encoding=self.encoding, newline="") as dst:
+            reader, writer = csv.reader(src), csv.writer(dst, lineterminator="\n")
+            next(reader)
+            writer.writerow(merged)
+            for line in reader:
+                writer.writerow(line + [""]*(len(merged)-len(line)))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+        self._header = merged
+        self._file = open(self.path, "a", encoding=self.encoding, newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+
+    def _flush_pending(self):
+        with self._lock:
+            self._timer = None
+            self._flush(fsync=True)
+
+    def _flush(self, fsync):
+        if self._file is None:
+            return
+        self._file.flush()
+        self._last_flush = time.time()
+        if fsync:
+            os.fsync(self._file.fileno())
+            self._last_fsync = self._last_flush
+
+    def flush(self, fsync=True):
+        with self._lock:
+            self._flush(fsync=fsync)
+
+    def close(self):
+        """
+        Flush, fsync and close the file.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._flush(fsync=True)
+                self._file.close()
+                self._file = None
+                self._writer = None